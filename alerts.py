@@ -0,0 +1,107 @@
+# Budget Alerts for Smart Budget Buddy
+# Checks only the budgets touched by a new expense, using the running window sums
+# kept by the store, and notifies when a budget crosses 80% (close) or 100% (over)
+
+import asyncio
+import logging
+from collections import deque
+import httpx
+from reports import budget_state, day_label
+from windows import day_number
+
+logger = logging.getLogger("budget_alerts")
+
+# Higher is worse; an alert fires only when a budget moves up this scale
+STATE_LEVELS = {"good": 0, "close": 1, "over": 2}
+
+
+def usage_percentage(spent, amount):
+    return (spent / amount) * 100 if amount > 0 else 0
+
+
+class LocalNotifier:
+    """Keeps the most recent alerts per tenant in memory and logs them"""
+
+    def __init__(self, max_alerts=50):
+        self.max_alerts = max_alerts
+        self._alerts = {}
+
+    async def notify(self, tenant, alert):
+        logger.info("Budget alert for %s: %s %s at %.1f%%",
+                    tenant, alert["category"], alert["state"], alert["percentage"])
+        if tenant not in self._alerts:
+            self._alerts[tenant] = deque(maxlen=self.max_alerts)
+        self._alerts[tenant].append(alert)
+
+    def recent(self, tenant):
+        """Newest first"""
+        return list(reversed(self._alerts.get(tenant, ())))
+
+
+class WebhookNotifier:
+    """POSTs each alert as JSON to a webhook URL (e.g. a chat or email relay)"""
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def notify(self, tenant, alert):
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                await client.post(self.url, json={"tenant": tenant, **alert})
+        except httpx.HTTPError as error:
+            logger.warning("Budget alert webhook failed: %s", error)
+
+
+class BudgetAlerts:
+    """Emit close/over alerts when an expense pushes a budget across a threshold"""
+
+    def __init__(self, notifiers):
+        self.notifiers = notifiers
+        self._deliveries = set()
+
+    def check(self, store, expense, today=None):
+        """Return alerts for the budgets that crossed a threshold because of this (already stored) expense"""
+        day = day_number(expense["date"])
+        alerts = []
+        for budget in store.budgets_for(expense["category"]):
+            spent, first, last = store.budget_spend(budget, today)
+            if day is None or not first <= day <= last:
+                continue
+
+            before = budget_state(usage_percentage(spent - expense["amount"], budget["amount"]))
+            percentage = usage_percentage(spent, budget["amount"])
+            state = budget_state(percentage)
+            if STATE_LEVELS[state] <= STATE_LEVELS[before]:
+                continue
+
+            alerts.append({
+                "type": "budget_alert",
+                "state": state,
+                "budget_id": budget["id"],
+                "category": budget["category"],
+                "period": budget.get("period", "monthly"),
+                "amount": budget["amount"],
+                "spent": round(spent, 2),
+                "percentage": round(percentage, 1),
+                "window_start": day_label(first),
+                "window_end": day_label(last),
+                "expense_id": expense["id"]
+            })
+        return alerts
+
+    def publish(self, tenant, alerts):
+        """Hand the alerts to every notifier without making the request wait for delivery"""
+        for alert in alerts:
+            for notifier in self.notifiers:
+                task = asyncio.create_task(notifier.notify(tenant, alert))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+
+
+def create_notifiers(local, webhook_url=None):
+    """The local notifier always runs; a webhook is added when a URL is configured"""
+    notifiers = [local]
+    if webhook_url:
+        notifiers.append(WebhookNotifier(webhook_url))
+    return notifiers
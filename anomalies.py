@@ -0,0 +1,160 @@
+# Spending Anomalies for Smart Budget Buddy
+# Running mean and variance (Welford's algorithm) of expense amounts per category
+# and of weekly spending per category, updated on every insert and delete. A new
+# expense far above its category's usual amount, or a week far above the usual
+# week, is flagged as it is written
+
+import os
+from collections import deque
+from windows import day_number
+from reports import day_label
+
+# How many standard deviations above the mean counts as unusual
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0"))
+
+# Don't judge a category before it has this many expenses (or weeks of spending)
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "5"))
+
+# Also require this multiple of the mean, so tiny deviations in steady series aren't flagged
+ANOMALY_MIN_RATIO = 1.5
+
+RECENT_ANOMALIES = 20
+
+
+class RunningStats:
+    """Welford's running mean and variance, with removal"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+
+    def std(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+    def z_score(self, value):
+        """Standard deviations above the mean, or None while there is too little history"""
+        std = self.std()
+        if self.count < ANOMALY_MIN_SAMPLES or std == 0 or value < ANOMALY_MIN_RATIO * self.mean:
+            return None
+        return (value - self.mean) / std
+
+
+def week_number(day):
+    # Weeks start on Monday, as in reports.bucket_indexes
+    return (day + 3) // 7
+
+
+def week_label(week):
+    return day_label(week * 7 - 3)
+
+
+class AnomalyDetector:
+    """Per-category running statistics for one partition, plus its recent anomalies"""
+
+    def __init__(self):
+        self.amounts = {}
+        self.weekly_totals = {}
+        self.weeks = {}
+        self.recent = deque(maxlen=RECENT_ANOMALIES)
+
+    def add(self, expense):
+        """Update the statistics with a new expense and return the anomalies it caused"""
+        category, amount = expense["category"], expense["amount"]
+        anomalies = []
+
+        stats = self.amounts.setdefault(category, RunningStats())
+        z = stats.z_score(amount)
+        if z is not None and z >= ANOMALY_Z_THRESHOLD:
+            anomalies.append({
+                "kind": "unusual_expense",
+                "category": category,
+                "expense_id": expense["id"],
+                "description": expense["description"],
+                "amount": round(amount, 2),
+                "typical": round(stats.mean, 2),
+                "z_score": round(z, 1)
+            })
+        stats.add(amount)
+
+        day = day_number(expense["date"])
+        if day is not None:
+            spike = self._week_spike(category, week_number(day), amount)
+            if spike is not None:
+                anomalies.append(spike)
+
+        self.recent.extend(anomalies)
+        return anomalies
+
+    def _week_spike(self, category, week, amount):
+        """Add an expense to its week and return a spike if the week just became unusual"""
+        before, after = self._update_week(category, week, amount)
+        if after <= 0:
+            return None
+
+        # Judge the week against the other weeks, leaving it out of the statistics
+        weeks = self.weeks[category]
+        weeks.remove(after)
+        z_before = weeks.z_score(before) if before else None
+        z_after = weeks.z_score(after)
+        typical = weeks.mean
+        weeks.add(after)
+
+        if z_after is None or z_after < ANOMALY_Z_THRESHOLD or (z_before or 0) >= ANOMALY_Z_THRESHOLD:
+            return None
+        return {
+            "kind": "spending_spike",
+            "category": category,
+            "week_start": week_label(week),
+            "amount": round(after, 2),
+            "typical": round(typical, 2),
+            "z_score": round(z_after, 1)
+        }
+
+    def remove(self, expense):
+        category, amount = expense["category"], expense["amount"]
+        if category in self.amounts:
+            self.amounts[category].remove(amount)
+
+        day = day_number(expense["date"])
+        if day is not None:
+            self._update_week(category, week_number(day), -amount)
+
+        remaining = [anomaly for anomaly in self.recent if anomaly.get("expense_id") != expense["id"]]
+        self.recent.clear()
+        self.recent.extend(remaining)
+
+    def recent_anomalies(self):
+        """Newest first"""
+        return list(reversed(self.recent))
+
+    def _update_week(self, category, week, amount):
+        """Change one week's total and keep the weekly statistics in step; returns (before, after)"""
+        key = (category, week)
+        weeks = self.weeks.setdefault(category, RunningStats())
+        before = self.weekly_totals.get(key, 0.0)
+        if key in self.weekly_totals:
+            weeks.remove(before)
+        after = before + amount
+        if after > 1e-9:
+            self.weekly_totals[key] = after
+            weeks.add(after)
+        else:
+            self.weekly_totals.pop(key, None)
+            after = 0.0
+        return before, after
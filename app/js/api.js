@@ -51,6 +51,40 @@ class BudgetAPI {
      */
     constructor(baseURL = API_BASE_URL) {
         this.baseURL = baseURL;
+
+        /** @type {string|null} Bearer token from login (null uses the shared demo data) */
+        this.token = typeof localStorage !== 'undefined' ? localStorage.getItem('budgetBuddyToken') : null;
+    }
+
+    /**
+     * Remember the bearer token sent with every request
+     * @param {string|null} token - Access token from login, or null to log out
+     */
+    setToken(token) {
+        this.token = token;
+        if (typeof localStorage !== 'undefined') {
+            if (token) {
+                localStorage.setItem('budgetBuddyToken', token);
+            } else {
+                localStorage.removeItem('budgetBuddyToken');
+            }
+        }
+    }
+
+    /**
+     * Build request headers, adding the Authorization header when logged in
+     * @param {Object} headers - Extra headers for this request
+     * @returns {Object} - Headers object
+     */
+    buildHeaders(headers = {}) {
+        const allHeaders = {
+            'Content-Type': 'application/json',
+            ...headers,
+        };
+        if (this.token) {
+            allHeaders['Authorization'] = `Bearer ${this.token}`;
+        }
+        return allHeaders;
     }
 
     /**
@@ -65,15 +99,9 @@ class BudgetAPI {
 
         const url = `${this.baseURL}${endpoint}`;
 
-        const defaultOptions = {
-            headers: {
-                'Content-Type': 'application/json',
-            },
-        };
-
         const config = {
-            ...defaultOptions,
             ...options,
+            headers: this.buildHeaders(options.headers),
         };
 
         try {
@@ -90,6 +118,49 @@ class BudgetAPI {
         }
     }
 
+    // =============================================================================
+    // AUTH METHODS
+    // =============================================================================
+
+    /**
+     * Register a new user
+     * @param {string} username - Username
+     * @param {string} password - Password
+     * @returns {Promise<Object>} - Success message
+     */
+    async register(username, password) {
+        return this.request('/api/auth/register', {
+            method: 'POST',
+            body: JSON.stringify({ username, password }),
+        });
+    }
+
+    /**
+     * Log in and store the returned token for later requests
+     * @param {string} username - Username
+     * @param {string} password - Password
+     * @returns {Promise<Object>} - Object containing access_token
+     * @example
+     * await api.login('alex', 'secret');
+     * const expenses = await api.getExpenses(); // Only alex's expenses
+     */
+    async login(username, password) {
+        const result = await this.request('/api/auth/login', {
+            method: 'POST',
+            body: JSON.stringify({ username, password }),
+        });
+        this.setToken(result.access_token);
+        return result;
+    }
+
+    /**
+     * Get the current user's profile
+     * @returns {Promise<Object>} - Username and data counts
+     */
+    async getProfile() {
+        return this.request('/api/auth/profile');
+    }
+
     // =============================================================================
     // EXPENSE METHODS
     // =============================================================================
@@ -105,6 +176,45 @@ class BudgetAPI {
         return this.request('/api/expenses');
     }
 
+    /**
+     * Import many expenses at once; ones without a category get a suggested one
+     * @param {Array} expenses - Expense objects (category optional)
+     * @returns {Promise<Object>} - Object with created, auto_categorized, expenses and alerts
+     */
+    async importExpenses(expenses) {
+        return this.request('/api/expenses/bulk', {
+            method: 'POST',
+            body: JSON.stringify({ expenses }),
+        });
+    }
+
+    /**
+     * Suggest categories for descriptions without creating expenses
+     * @param {Array<string>} descriptions - Expense descriptions
+     * @returns {Promise<Object>} - Object with one suggestion (category, confidence, source) per description
+     * @example
+     * const { suggestions } = await api.categorizeExpenses(['Uber ride', 'Whole Foods']);
+     */
+    async categorizeExpenses(descriptions) {
+        return this.request('/api/expenses/categorize', {
+            method: 'POST',
+            body: JSON.stringify({ descriptions }),
+        });
+    }
+
+    /**
+     * Search expense descriptions, best matches first
+     * @param {string} query - Words to look for (prefixes and small typos match too)
+     * @param {Object} [filters] - Optional category, start_date, end_date and limit
+     * @returns {Promise<Object>} - Object with total and results (expenses with a score)
+     * @example
+     * const result = await api.searchExpenses('whole foods', { category: 'food' });
+     */
+    async searchExpenses(query, filters = {}) {
+        const params = new URLSearchParams({ q: query, ...filters });
+        return this.request(`/api/expenses/search?${params}`);
+    }
+
     /**
      * Create a new expense
      * @param {Object} expenseData - Expense data object
@@ -112,7 +222,8 @@ class BudgetAPI {
      * @param {string} expenseData.category - Expense category
      * @param {string} expenseData.description - Expense description
      * @param {string} [expenseData.date] - Expense date (optional, defaults to now)
-     * @returns {Promise<Object>} - Created expense object
+     * @param {string} [idempotencyKey] - Reuse the same key when retrying so the expense is only created once
+     * @returns {Promise<Object>} - Created expense object (with duplicate_of if it looks like a double-post)
      * @example
      * 
      * const expense = await api.createExpense({
@@ -121,9 +232,10 @@ class BudgetAPI {
      *     description: 'Coffee and pastry'
      * });
      */
-    async createExpense(expenseData) {
+    async createExpense(expenseData, idempotencyKey = null) {
         return this.request('/api/expenses', {
             method: 'POST',
+            headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
             body: JSON.stringify(expenseData),
         });
     }
@@ -161,7 +273,8 @@ class BudgetAPI {
      * @param {Object} budgetData - Budget data object
      * @param {string} budgetData.category - Budget category
      * @param {number} budgetData.amount - Budget amount
-     * @param {string} [budgetData.period] - Budget period (default: 'monthly')
+     * @param {string} [budgetData.period] - Budget period: weekly, biweekly, monthly, quarterly or yearly (default: 'monthly')
+     * @param {string} [budgetData.window] - 'calendar' (this month) or 'rolling' (last 30 days) (default: 'calendar')
      * @returns {Promise<Object>} - Created budget object
      * @example
      * const budget = await api.createBudget({
@@ -201,6 +314,90 @@ class BudgetAPI {
         });
     }
 
+    /**
+     * Get AI insights for several questions in one request
+     * @param {Array} expenses - Array of expense objects
+     * @param {Array<string>} questions - Questions to ask the AI
+     * @returns {Promise<Object>} - Object with an answers array and a shared summary
+     * @example
+     * const result = await api.getAIInsightsBatch(expenses, ['How can I save?', 'What should I budget?']);
+     * console.log(result.answers[0].insight); // Insight for the first question
+     */
+    async getAIInsightsBatch(expenses, questions) {
+        return this.request('/api/ai/insights/batch', {
+            method: 'POST',
+            body: JSON.stringify({
+                expenses: expenses,
+                questions: questions
+            }),
+        });
+    }
+
+    /**
+     * Stream AI-powered financial insights as Server-Sent Events
+     *
+     * The summary arrives first, followed by the insight text token by token,
+     * then the recommendations. EventSource only supports GET, so the stream is
+     * read from a POST fetch response instead.
+     *
+     * @param {Array} expenses - Array of expense objects
+     * @param {string} question - Question to ask the AI
+     * @param {Function} onEvent - Called with (eventName, data) for every event
+     * @returns {Promise<void>} - Resolves when the stream ends
+     * @example
+     * await api.streamAIInsights(expenses, 'How can I save money?', (event, data) => {
+     *     if (event === 'token') console.log(data);
+     * });
+     */
+    async streamAIInsights(expenses, question, onEvent) {
+        const response = await fetch(`${this.baseURL}/api/ai/insights/stream`, {
+            method: 'POST',
+            headers: this.buildHeaders({
+                'Accept': 'text/event-stream',
+            }),
+            body: JSON.stringify({
+                expenses: expenses,
+                question: question
+            }),
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE messages are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const message = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let data = '';
+                message.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        eventName = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+
+                onEvent(eventName, data ? JSON.parse(data) : null);
+            }
+        }
+    }
+
     // =============================================================================
     // REPORTS METHODS
     // =============================================================================
@@ -217,6 +414,84 @@ class BudgetAPI {
         return this.request('/api/reports/monthly');
     }
 
+    /**
+     * Get spent, remaining and status for every budget, computed by the server
+     * @returns {Promise<Object>} - Object containing a budgets array with spent, remaining, percentage and status
+     * @example
+     * const result = await api.getBudgetStatus();
+     * console.log(result.budgets[0].status); // 'over', 'close' or 'good'
+     */
+    async getBudgetStatus() {
+        return this.request('/api/reports/budget-status');
+    }
+
+    /**
+     * Get recurring charges (subscriptions, bills) detected in the expenses
+     * @returns {Promise<Object>} - Object with a recurring array (period, amount, next_date, confidence...)
+     */
+    async getRecurring() {
+        return this.request('/api/recurring');
+    }
+
+    /**
+     * Get spending totals per day, week or month
+     * @param {string} [bucket] - 'day', 'week' or 'month' (default: 'month')
+     * @param {string} [category] - Only include this category (optional)
+     * @returns {Promise<Object>} - Object with labels, values and counts arrays
+     * @example
+     * const trend = await api.getTimeseries('week', 'food');
+     * chartManager.createTrendChart('trend-chart', trend);
+     */
+    async getTimeseries(bucket = 'month', category = null) {
+        const params = new URLSearchParams({ bucket });
+        if (category) {
+            params.set('category', category);
+        }
+        return this.request(`/api/reports/timeseries?${params}`);
+    }
+
+    /**
+     * Get the median, p90 and p99 expense size overall and per month
+     * @param {string} [category] - Only include this category (optional)
+     * @param {string} [startMonth] - First month, 'YYYY-MM' (optional)
+     * @param {string} [endMonth] - Last month, 'YYYY-MM' (optional)
+     * @returns {Promise<Object>} - Object with overall and months distributions
+     * @example
+     * const sizes = await api.getDistribution('food');
+     * console.log(sizes.overall.p90); // 90% of food expenses are at most this much
+     */
+    async getDistribution(category = null, startMonth = null, endMonth = null) {
+        const params = new URLSearchParams();
+        if (category) {
+            params.set('category', category);
+        }
+        if (startMonth) {
+            params.set('start_month', startMonth);
+        }
+        if (endMonth) {
+            params.set('end_month', endMonth);
+        }
+        return this.request(`/api/reports/distribution?${params}`);
+    }
+
+    /**
+     * Forecast spending for the current period and the ones after it
+     * @param {string} [category] - Only forecast this category (optional)
+     * @param {number} [horizon] - Number of periods to forecast (default: 3)
+     * @param {string} [bucket] - 'day', 'week' or 'month' (default: 'month')
+     * @returns {Promise<Object>} - Object with the model, current period projection, forecast and budgets
+     * @example
+     * const outlook = await api.getForecast('food');
+     * console.log(outlook.budgets[0].forecast_status); // 'over'
+     */
+    async getForecast(category = null, horizon = 3, bucket = 'month') {
+        const params = new URLSearchParams({ horizon, bucket });
+        if (category) {
+            params.set('category', category);
+        }
+        return this.request(`/api/forecast?${params}`);
+    }
+
     // =============================================================================
     // UTILITY METHODS
     // =============================================================================
@@ -255,6 +530,45 @@ class BudgetAPI {
             method: 'POST',
         });
     }
+
+    /**
+     * Subscribe to live change events over a WebSocket, reconnecting when it drops
+     * @param {Function} onEvent - Called with every event object (expense_created, expense_deleted,
+     *                             budget_created, budget_alert, data_reset)
+     * @param {Function} [onStatus] - Called with true when connected and false when disconnected
+     * @returns {Function} - Call to close the connection for good
+     * @example
+     * const stop = api.connectLiveUpdates(event => console.log(event.type));
+     */
+    connectLiveUpdates(onEvent, onStatus = () => {}) {
+        const wsURL = this.baseURL.replace(/^http/, 'ws') + '/ws' +
+            (this.token ? `?token=${encodeURIComponent(this.token)}` : '');
+        let socket = null;
+        let retryDelay = 1000;
+        let stopped = false;
+
+        const connect = () => {
+            socket = new WebSocket(wsURL);
+            socket.onopen = () => {
+                retryDelay = 1000;
+                onStatus(true);
+            };
+            socket.onmessage = message => onEvent(JSON.parse(message.data));
+            socket.onclose = () => {
+                onStatus(false);
+                if (!stopped) {
+                    setTimeout(connect, retryDelay);
+                    retryDelay = Math.min(retryDelay * 2, 30000);
+                }
+            };
+        };
+
+        connect();
+        return () => {
+            stopped = true;
+            socket.close();
+        };
+    }
 }
 
 // =============================================================================
@@ -48,9 +48,18 @@ class BudgetBuddyApp {
         /** @type {Array} Array of budget objects */
         this.budgets = [];
 
+        /** @type {Array} Budget status objects from the server */
+        this.budgetStatus = [];
+
+        /** @type {Object} Spending per category, kept current by live updates */
+        this.categoryBreakdown = {};
+
         /** @type {boolean} Loading state indicator */
         this.isLoading = false;
 
+        /** @type {boolean} Whether the live update WebSocket is connected */
+        this.isLive = false;
+
         // Start initialization
         this.init();
     }
@@ -63,6 +72,70 @@ class BudgetBuddyApp {
         this.setupEventListeners();
         await this.loadInitialData();
         this.showSection('dashboard');
+
+        // Keep the views current from pushed change events instead of refetching
+        api.connectLiveUpdates(
+            event => this.handleLiveEvent(event),
+            live => { this.isLive = live; }
+        );
+    }
+
+    /**
+     * Apply a change event pushed by the server to the local state and current view
+     * @param {Object} event - Event from /ws (see connectLiveUpdates in api.js)
+     */
+    async handleLiveEvent(event) {
+        if (event.type === 'budget_alert') {
+            const label = event.state === 'over' ? 'is over budget' : 'is close to its budget';
+            this.showError(`${this.formatCategory(event.category)} ${label} (${event.percentage.toFixed(1)}%)`);
+            return;
+        }
+
+        if (event.type === 'spending_anomaly') {
+            const category = this.formatCategory(event.category);
+            this.showError(event.kind === 'unusual_expense'
+                ? `Unusual ${category} expense: $${event.amount.toFixed(2)} (usually about $${event.typical.toFixed(2)})`
+                : `${category} spending this week is unusually high: $${event.amount.toFixed(2)}`);
+            return;
+        }
+
+        if (event.type === 'data_reset' || event.type === 'expenses_imported') {
+            await this.loadInitialData();
+            this.showSection(this.currentSection);
+            return;
+        }
+
+        if (event.type === 'expense_created' && !this.expenses.some(e => e.id === event.expense.id)) {
+            this.expenses.push(event.expense);
+        } else if (event.type === 'expense_deleted') {
+            this.expenses = this.expenses.filter(e => e.id !== event.expense_id);
+        }
+
+        // Totals and budget status for the affected category come with the event
+        if (event.category_total > 0) {
+            this.categoryBreakdown[event.category] = event.category_total;
+        } else {
+            delete this.categoryBreakdown[event.category];
+        }
+        event.budgets.forEach(budget => {
+            const index = this.budgetStatus.findIndex(b => b.id === budget.id);
+            if (index >= 0) {
+                this.budgetStatus[index] = budget;
+            } else {
+                this.budgetStatus.push(budget);
+            }
+            if (!this.budgets.some(b => b.id === budget.id)) {
+                this.budgets.push(budget);
+            }
+        });
+
+        if (this.currentSection === 'dashboard') {
+            this.renderSummary(event.total_spent, event.expense_count);
+        } else if (this.currentSection === 'expenses') {
+            this.loadExpenses();
+        } else if (this.currentSection === 'budgets') {
+            this.renderBudgets();
+        }
     }
 
     /**
@@ -176,27 +249,13 @@ class BudgetBuddyApp {
         try {
             // Get monthly report data from backend
             const report = await api.getMonthlyReport();
+            this.categoryBreakdown = report.category_breakdown || {};
+            this.renderSummary(report.total_spent, report.expense_count);
 
-            // Update dashboard summary cards
-            document.getElementById('total-spent').textContent =
-                `$${report.total_spent.toFixed(2)}`;
-            document.getElementById('expense-count').textContent =
-                report.expense_count;
-            document.getElementById('budget-count').textContent =
-                this.budgets.length;
-
-            // Update spending chart
-            if (report.category_breakdown && Object.keys(report.category_breakdown).length > 0) {
-                chartManager.createSpendingChart('spending-chart', report.category_breakdown);
-            } else {
-                // Show empty state when no data is available
-                const canvas = document.getElementById('spending-chart');
-                const ctx = canvas.getContext('2d');
-                ctx.clearRect(0, 0, canvas.width, canvas.height);
-                ctx.font = '16px Arial';
-                ctx.textAlign = 'center';
-                ctx.fillStyle = '#7f8c8d';
-                ctx.fillText('No spending data available', canvas.width / 2, canvas.height / 2);
+            // Update spending trend chart with real weekly totals
+            const trend = await api.getTimeseries('week');
+            if (trend.labels.length > 0) {
+                chartManager.createTrendChart('trend-chart', trend);
             }
 
         } catch (error) {
@@ -204,6 +263,35 @@ class BudgetBuddyApp {
         }
     }
 
+    /**
+     * Render the dashboard summary cards and spending chart
+     * @param {number} totalSpent - Total spent across all categories
+     * @param {number} expenseCount - Number of expenses
+     */
+    renderSummary(totalSpent, expenseCount) {
+        // Update dashboard summary cards
+        document.getElementById('total-spent').textContent =
+            `$${totalSpent.toFixed(2)}`;
+        document.getElementById('expense-count').textContent =
+            expenseCount;
+        document.getElementById('budget-count').textContent =
+            this.budgets.length;
+
+        // Update spending chart
+        if (Object.keys(this.categoryBreakdown).length > 0) {
+            chartManager.createSpendingChart('spending-chart', this.categoryBreakdown);
+        } else {
+            // Show empty state when no data is available
+            const canvas = document.getElementById('spending-chart');
+            const ctx = canvas.getContext('2d');
+            ctx.clearRect(0, 0, canvas.width, canvas.height);
+            ctx.font = '16px Arial';
+            ctx.textAlign = 'center';
+            ctx.fillStyle = '#7f8c8d';
+            ctx.fillText('No spending data available', canvas.width / 2, canvas.height / 2);
+        }
+    }
+
     // =============================================================================
     // FORM HANDLERS
     // =============================================================================
@@ -229,23 +317,37 @@ class BudgetBuddyApp {
             if (!expenseData.amount || expenseData.amount <= 0) {
                 throw new Error('Please enter a valid amount');
             }
+            // Create expense via API (an empty category is suggested by the server)
             if (!expenseData.category) {
-                throw new Error('Please select a category');
+                delete expenseData.category;
             }
-
-            // Create expense via API
             this.setLoading(true);
-            const response = await api.createExpense(expenseData);
+            // One key per submitted form, so a retried or double-clicked submit creates one expense
+            const response = await api.createExpense(expenseData, this.expenseSubmitKey(expenseData));
 
-            // Update local state and UI
-            this.expenses.push(response.expense);
-            this.showSuccess('Expense added successfully!');
+            // Update local state and UI (the live update for this expense may have arrived first)
+            if (!this.expenses.some(e => e.id === response.expense.id)) {
+                this.expenses.push(response.expense);
+            }
+            if (response.categorization) {
+                this.showSuccess(`Expense added as ${this.formatCategory(response.expense.category)}!`);
+            } else {
+                this.showSuccess('Expense added successfully!');
+            }
+            if (response.expense.duplicate_of) {
+                this.showError('This looks like a duplicate of an expense you already added');
+            }
+            this.lastExpenseSubmit = null;
             form.reset();
             this.loadExpenses();
 
-            // Update dashboard if currently viewing it
-            if (this.currentSection === 'dashboard') {
-                this.updateDashboard();
+            // Without live updates, show alerts and refresh the dashboard ourselves
+            if (!this.isLive) {
+                (response.alerts || []).forEach(alert => this.handleLiveEvent(alert));
+                (response.anomalies || []).forEach(anomaly => this.handleLiveEvent({ type: 'spending_anomaly', ...anomaly }));
+                if (this.currentSection === 'dashboard') {
+                    this.updateDashboard();
+                }
             }
 
         } catch (error) {
@@ -268,7 +370,8 @@ class BudgetBuddyApp {
             const budgetData = {
                 category: formData.get('category') || document.getElementById('budget-category').value,
                 amount: parseFloat(formData.get('amount') || document.getElementById('budget-amount').value),
-                period: formData.get('period') || document.getElementById('budget-period').value
+                period: formData.get('period') || document.getElementById('budget-period').value,
+                window: formData.get('window') || document.getElementById('budget-window').value
             };
 
             // Validate data
@@ -282,10 +385,14 @@ class BudgetBuddyApp {
             this.setLoading(true);
             const response = await api.createBudget(budgetData);
 
-            this.budgets.push(response.budget);
+            if (!this.budgets.some(b => b.id === response.budget.id)) {
+                this.budgets.push(response.budget);
+            }
             this.showSuccess('Budget created successfully!');
             form.reset();
-            this.loadBudgets();
+            if (!this.isLive) {
+                this.loadBudgets();
+            }
 
         } catch (error) {
             console.error('Failed to create budget:', error);
@@ -307,9 +414,21 @@ class BudgetBuddyApp {
             const container = document.getElementById('ai-insights-container');
             container.innerHTML = '<div class="loading">Getting AI insights...</div>';
 
-            const response = await api.getAIInsights(this.expenses, question);
+            // Render the insight as it streams in instead of waiting for the full response
+            const insights = { insight: '', recommendations: [] };
+            await api.streamAIInsights(this.expenses, question, (event, data) => {
+                if (event === 'summary') {
+                    insights.summary = data;
+                } else if (event === 'token') {
+                    insights.insight += data;
+                } else if (event === 'recommendations') {
+                    insights.recommendations = data;
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+                this.displayAIInsights(insights);
+            });
 
-            this.displayAIInsights(response);
             document.getElementById('ai-question').value = '';
 
         } catch (error) {
@@ -323,7 +442,19 @@ class BudgetBuddyApp {
     displayAIInsights(insights) {
         const container = document.getElementById('ai-insights-container');
 
-        let html = `
+        let html = '';
+
+        if (insights.summary) {
+            html += `
+                <div class="ai-summary">
+                    <small>Total spent: $${insights.summary.total_spent.toFixed(2)} ·
+                    Top category: ${this.formatCategory(insights.summary.top_category)} ·
+                    ${insights.summary.expense_count} expenses</small>
+                </div>
+            `;
+        }
+
+        html += `
             <div class="ai-insight">
                 <p>${insights.insight}</p>
             </div>
@@ -358,7 +489,7 @@ class BudgetBuddyApp {
                 <div class="expense-info">
                     <div class="expense-amount">$${expense.amount.toFixed(2)}</div>
                     <div class="expense-category">${this.formatCategory(expense.category)}</div>
-                    <div class="expense-description">${expense.description}</div>
+                    <div class="expense-description">${expense.description}${expense.duplicate_of ? ' <small>(possible duplicate)</small>' : ''}</div>
                     <div class="expense-date">${this.formatDate(expense.date)}</div>
                 </div>
                 <button class="btn btn-danger" onclick="app.deleteExpense(${expense.id})">
@@ -370,7 +501,7 @@ class BudgetBuddyApp {
         container.innerHTML = html;
     }
 
-    loadBudgets() {
+    async loadBudgets() {
         const container = document.getElementById('budgets-container');
 
         if (this.budgets.length === 0) {
@@ -378,10 +509,25 @@ class BudgetBuddyApp {
             return;
         }
 
-        const html = this.budgets.map(budget => {
-            const spent = this.calculateSpentForCategory(budget.category);
-            const percentage = (spent / budget.amount) * 100;
-            const isOverBudget = percentage > 100;
+        // Spent amounts come from the server instead of summing every expense here
+        try {
+            this.budgetStatus = (await api.getBudgetStatus()).budgets;
+        } catch (error) {
+            console.error('Failed to load budget status:', error);
+            this.showError('Failed to load budget status');
+            return;
+        }
+
+        this.renderBudgets();
+    }
+
+    renderBudgets() {
+        const container = document.getElementById('budgets-container');
+
+        const html = this.budgetStatus.map(budget => {
+            const spent = budget.spent;
+            const percentage = budget.percentage;
+            const isOverBudget = budget.status === 'over';
 
             return `
                 <div class="budget-item">
@@ -393,7 +539,8 @@ class BudgetBuddyApp {
                                 <div class="progress-fill ${isOverBudget ? 'over-budget' : ''}" 
                                      style="width: ${Math.min(percentage, 100)}%"></div>
                             </div>
-                            <small>Spent: $${spent.toFixed(2)} (${percentage.toFixed(1)}%)</small>
+                            <small>Spent: $${spent.toFixed(2)} (${percentage.toFixed(1)}%) from ${budget.window_start} to ${budget.window_end}</small>
+                            ${budget.upcoming_recurring > 0 ? `<small>+$${budget.upcoming_recurring.toFixed(2)} in recurring charges expected before ${budget.window_end}</small>` : ''}
                         </div>
                     </div>
                 </div>
@@ -416,8 +563,8 @@ class BudgetBuddyApp {
             this.showSuccess('Expense deleted successfully!');
             this.loadExpenses();
 
-            // Update dashboard if it's the current section
-            if (this.currentSection === 'dashboard') {
+            // Update dashboard if it's the current section (live updates do this otherwise)
+            if (!this.isLive && this.currentSection === 'dashboard') {
                 this.updateDashboard();
             }
 
@@ -456,10 +603,18 @@ class BudgetBuddyApp {
         }
     }
 
-    calculateSpentForCategory(category) {
-        return this.expenses
-            .filter(expense => expense.category === category)
-            .reduce((total, expense) => total + expense.amount, 0);
+    /**
+     * Idempotency key for an expense form submission, reused while the same data is resubmitted
+     * @param {Object} expenseData - Expense data being submitted
+     * @returns {string} - Key for the Idempotency-Key header
+     */
+    expenseSubmitKey(expenseData) {
+        const body = JSON.stringify(expenseData);
+        if (!this.lastExpenseSubmit || this.lastExpenseSubmit.body !== body) {
+            const key = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+            this.lastExpenseSubmit = { body, key };
+        }
+        return this.lastExpenseSubmit.key;
     }
 
     formatCategory(category) {
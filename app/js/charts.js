@@ -168,14 +168,14 @@ class ChartManager {
      * Create a bar chart comparing budget vs actual spending
      * 
      * @param {string} canvasId - ID of the canvas element
-     * @param {Array} budgets - Array of budget objects
-     * @param {Array} expenses - Array of expense objects
+     * @param {Array} budgets - Budget status objects from /api/reports/budget-status
      * @returns {Chart|null} - Chart.js instance or null if canvas not found
      * 
      * @example
-     * chartManager.createBudgetChart('budget-chart', budgets, expenses);
+     * const result = await api.getBudgetStatus();
+     * chartManager.createBudgetChart('budget-chart', result.budgets);
      */
-    createBudgetChart(canvasId, budgets, expenses) {
+    createBudgetChart(canvasId, budgets) {
         const ctx = document.getElementById(canvasId);
         if (!ctx) return null;
 
@@ -184,17 +184,10 @@ class ChartManager {
             this.charts[canvasId].destroy();
         }
 
-        // Calculate spent amounts by category
-        const spentByCategory = {};
-        expenses.forEach(expense => {
-            const category = expense.category;
-            spentByCategory[category] = (spentByCategory[category] || 0) + expense.amount;
-        });
-
-        // Prepare chart data
+        // Prepare chart data (spent amounts are computed by the server)
         const labels = budgets.map(budget => budget.category);
         const budgetAmounts = budgets.map(budget => budget.amount);
-        const spentAmounts = budgets.map(budget => spentByCategory[budget.category] || 0);
+        const spentAmounts = budgets.map(budget => budget.spent);
 
         const chartData = {
             labels: labels,
@@ -264,7 +257,7 @@ class ChartManager {
     }
 
     /**
-     * Create a line chart showing monthly spending trends
+     * Create a line chart showing spending trends (from /api/reports/timeseries)
      * 
      * @param {string} canvasId - ID of the canvas element
      * @param {Object} monthlyData - Monthly data with labels and values
@@ -291,7 +284,7 @@ class ChartManager {
         const chartData = {
             labels: monthlyData.labels,
             datasets: [{
-                label: 'Monthly Spending',
+                label: 'Spending',
                 data: monthlyData.values,
                 borderColor: this.colors.primary,
                 backgroundColor: this.colors.primary + '20',
@@ -314,7 +307,7 @@ class ChartManager {
                 plugins: {
                     title: {
                         display: true,
-                        text: 'Monthly Spending Trend',
+                        text: 'Spending Trend',
                         font: {
                             size: 16,
                             weight: 'bold'
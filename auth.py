@@ -0,0 +1,103 @@
+# Authentication for Smart Budget Buddy
+# Password hashing and JWT access tokens. The token subject is the username,
+# which is also the key of the user's data partition in store.py. Verified tokens
+# are cached until they expire, and bcrypt runs in a small thread pool so it
+# doesn't block the event loop
+
+import os
+import asyncio
+import logging
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+from lru import LRUCache
+
+logger = logging.getLogger("auth")
+
+# The placeholder from .env.example is public, so it is treated the same as no key
+PLACEHOLDER_SECRET_KEY = "your_secret_key_here_generate_a_strong_key"
+
+
+def load_secret_key():
+    """SECRET_KEY from the environment, or a random key for this process if it is unset"""
+    key = os.getenv("SECRET_KEY")
+    if key and key != PLACEHOLDER_SECRET_KEY:
+        return key
+    logger.warning("SECRET_KEY is not set; using a random key, so tokens won't survive a restart")
+    return secrets.token_urlsafe(32)
+
+
+SECRET_KEY = load_secret_key()
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt is deliberately slow, so it gets its own bounded pool of worker threads
+password_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "4")),
+    thread_name_prefix="password-hash"
+)
+
+# Registered users (for tutorial purposes - replace with database in production)
+users_db = {}
+
+
+async def hash_password(password):
+    """Hash a password in the password thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.hash, password)
+
+
+async def verify_password(password, hashed_password):
+    """Check a password in the password thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.verify, password, hashed_password)
+
+
+class VerifiedTokenCache(LRUCache):
+    """LRU cache of token -> username for tokens whose signature was already checked
+
+    Each entry expires at its token's exp claim (a Unix time), so it uses the wall clock.
+    """
+
+    def __init__(self, max_size=10000):
+        super().__init__(max_size, clock=time.time)
+
+
+token_cache = VerifiedTokenCache(max_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+
+
+def create_access_token(username):
+    """Create a signed access token for a user"""
+    expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode({"sub": username, "exp": expires_at}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token):
+    """Return the username from a valid access token, or raise 401"""
+    # Tokens seen before skip signature verification until they expire
+    username = token_cache.get(token)
+    if username is not None and username in users_db:
+        return username
+
+    credentials_error = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_error
+
+    username = payload.get("sub")
+    if username is None or username not in users_db:
+        raise credentials_error
+
+    token_cache.set(token, username, payload["exp"])
+    return username
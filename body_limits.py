@@ -0,0 +1,363 @@
+# Request Body Limits for Smart Budget Buddy
+# A middleware that rejects request bodies over a configurable size, and a
+# streaming parser for the AI insight bodies that adds up the expense totals as
+# the bytes arrive instead of building the whole expenses list in memory
+
+import codecs
+import json
+import re
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# What ends or nests a JSON value: quotes and brackets outside strings, quotes
+# and escapes inside them, and anything that can't be part of a number or literal
+STRUCTURE = re.compile(r'["{}\[\]]')
+STRING_SPECIAL = re.compile(r'["\\]')
+SCALAR_END = re.compile(r"[^0-9A-Za-z+\-.]")
+SCALAR_START = "-0123456789tfnNI"
+
+# Longest field value or single expense accepted in an AI insight body
+MAX_VALUE_CHARS = 64 * 1024
+
+
+class BodyTooLarge(HTTPException):
+    """Raised while reading a request body that is over the limit
+
+    An HTTPException, so FastAPI's body reading passes it on as a 413 instead of
+    turning it into "There was an error parsing the body".
+    """
+
+    def __init__(self, limit):
+        super().__init__(status_code=413, detail=f"Request body is larger than {limit} bytes")
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies larger than max_bytes with 413
+
+    Paths starting with a prefix in `overrides` get that limit instead, which lets
+    the streamed AI insight endpoints accept larger bodies than everything else.
+    """
+
+    def __init__(self, app, max_bytes, overrides=None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.overrides = overrides or {}
+
+    def limit_for(self, path):
+        for prefix, limit in self.overrides.items():
+            if path.startswith(prefix):
+                return limit
+        return self.max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+
+        # Refuse up front when the client tells us the size
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                await payload_too_large(limit)(scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLarge:
+            if response_started:
+                raise
+            await payload_too_large(limit)(scope, receive, send)
+
+
+def payload_too_large(limit):
+    return JSONResponse({"detail": BodyTooLarge(limit).detail}, status_code=413)
+
+
+class InsightBodyParser:
+    """Incrementally parse an AI insight request body
+
+    Expects a JSON object with an "expenses" array plus any other fields
+    ("question" or "questions"). Each expense is summarized and dropped as soon as
+    it has been parsed, so memory stays bounded by the size of one expense.
+    A value split across chunks is kept aside and only the new text is scanned
+    for its end, so parsing stays linear in the body size. Raises ValueError for
+    malformed bodies and for values over MAX_VALUE_CHARS.
+    """
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.state = "start"
+        self.key = None
+        self.closed = False
+
+        # The start of a value still arriving, and where the scan for its end got to
+        self.pending = None
+        self.pending_size = 0
+        self.value_end = None
+        self.scalar = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+        self.fields = {}
+        self.saw_expenses = False
+        self.total_spent = 0
+        self.categories = {}
+        self.expense_count = 0
+
+    def feed(self, chunk):
+        """Parse as much of the body as the bytes received so far allow"""
+        self._receive(self.text_decoder.decode(chunk))
+        self._parse()
+
+    def close(self):
+        """Finish parsing and return the parsed fields and expense summary"""
+        self._receive(self.text_decoder.decode(b"", final=True))
+        if self.pending is not None:
+            self.buffer = "".join(self.pending)
+            self.pending = None
+        self.closed = True
+        self._parse()
+
+        if self.state != "done" or self.buffer[self.pos:].strip():
+            raise ValueError("Request body is not a complete JSON object")
+        if not self.saw_expenses:
+            raise ValueError("Field required: expenses")
+        return self.fields
+
+    def _next_char(self):
+        """Skip whitespace and return the next character, or None if we need more data"""
+        self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+        return self.buffer[self.pos] if self.pos < len(self.buffer) else None
+
+    def _receive(self, text):
+        """Add decoded text to the buffer, or to the value still arriving"""
+        if self.pending is None:
+            self.buffer = self.buffer[self.pos:] + text
+            self.pos = 0
+            return
+
+        end = self._scan(text, 0)
+        if end is None:
+            self._hold(text)
+            return
+
+        # The value is complete: put it back in front of the rest of the text
+        held = "".join(self.pending)
+        self.pending = None
+        self.buffer = held + text
+        self.pos = 0
+        self.value_end = len(held) + end
+
+    def _hold(self, text):
+        if self.pending is None:
+            self.pending = []
+            self.pending_size = 0
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size > MAX_VALUE_CHARS:
+            raise ValueError(f"Each field and expense must be at most {MAX_VALUE_CHARS} characters")
+
+    def _decode_value(self):
+        """Decode one JSON value at pos, or return (None, False) if it may be incomplete"""
+        end = self.value_end
+        self.value_end = None
+        if end is None:
+            # Most values arrive whole within one chunk
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                pass
+            else:
+                # A number or literal is only complete once something that can't continue it follows
+                if self.closed or (end < len(self.buffer) and (
+                        self.buffer[self.pos] not in SCALAR_START or SCALAR_END.match(self.buffer, end))):
+                    return self._accept(value, end)
+
+            self._start_scan(self.buffer[self.pos])
+            end = self._scan(self.buffer, self.pos)
+            if end is None:
+                if not self.closed:
+                    self._hold(self.buffer[self.pos:])
+                    self.buffer = ""
+                    self.pos = 0
+                    return None, False
+                end = len(self.buffer)
+
+        try:
+            value = self.decoder.decode(self.buffer[self.pos:end])
+        except json.JSONDecodeError:
+            raise ValueError("Request body is not valid JSON")
+        return self._accept(value, end)
+
+    def _accept(self, value, end):
+        if end - self.pos > MAX_VALUE_CHARS:
+            raise ValueError(f"Each field and expense must be at most {MAX_VALUE_CHARS} characters")
+        self.pos = end
+        return value, True
+
+    def _start_scan(self, char):
+        if char not in '"{[' and char not in SCALAR_START:
+            raise ValueError("Request body is not valid JSON")
+        self.scalar = char in SCALAR_START
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def _scan(self, text, pos):
+        """End of the value being scanned within text, or None if it goes on past it"""
+        if self.scalar:
+            match = SCALAR_END.search(text, pos)
+            return match.start() if match else None
+
+        while True:
+            if self.in_string:
+                if self.escaped:
+                    if pos >= len(text):
+                        return None
+                    pos += 1
+                    self.escaped = False
+                match = STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                if match.group() == "\\":
+                    self.escaped = True
+                    continue
+                self.in_string = False
+                if self.depth == 0:
+                    return pos
+            else:
+                match = STRUCTURE.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self.in_string = True
+                elif char in "{[":
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth == 0:
+                        return pos
+
+    def _parse(self):
+        while True:
+            char = self._next_char()
+            if char is None:
+                return
+
+            if self.state == "start":
+                if char != "{":
+                    raise ValueError("Request body must be a JSON object")
+                self.pos += 1
+                self.state = "key_or_end"
+
+            elif self.state in ("key_or_end", "key"):
+                if char == "}" and self.state == "key_or_end":
+                    self.pos += 1
+                    self.state = "done"
+                    continue
+                if char != '"':
+                    raise ValueError("Expected a field name")
+                key, complete = self._decode_value()
+                if not complete:
+                    return
+                self.key = key
+                self.state = "colon"
+
+            elif self.state == "colon":
+                if char != ":":
+                    raise ValueError("Expected ':' after field name")
+                self.pos += 1
+                self.state = "value"
+
+            elif self.state == "value":
+                if self.key == "expenses":
+                    if char != "[":
+                        raise ValueError("expenses must be a list")
+                    self.pos += 1
+                    if self.saw_expenses:
+                        # A repeated key replaces the earlier value, as it does in json.loads
+                        self.total_spent = 0
+                        self.categories = {}
+                        self.expense_count = 0
+                    self.saw_expenses = True
+                    self.state = "expense_or_end"
+                    continue
+                value, complete = self._decode_value()
+                if not complete:
+                    return
+                self.fields[self.key] = value
+                self.state = "after_value"
+
+            elif self.state in ("expense_or_end", "expense"):
+                if char == "]" and self.state == "expense_or_end":
+                    self.pos += 1
+                    self.state = "after_value"
+                    continue
+                expense, complete = self._decode_value()
+                if not complete:
+                    return
+                self._add_expense(expense)
+                self.state = "after_expense"
+
+            elif self.state == "after_expense":
+                self.pos += 1
+                if char == ",":
+                    self.state = "expense"
+                elif char == "]":
+                    self.state = "after_value"
+                else:
+                    raise ValueError("Expected ',' or ']' in expenses")
+
+            elif self.state == "after_value":
+                self.pos += 1
+                if char == ",":
+                    self.state = "key"
+                elif char == "}":
+                    self.state = "done"
+                else:
+                    raise ValueError("Expected ',' or '}'")
+
+            elif self.state == "done":
+                raise ValueError("Unexpected data after the JSON object")
+
+    def _add_expense(self, expense):
+        if not isinstance(expense, dict):
+            raise ValueError("Each expense must be an object")
+        amount = expense.get("amount")
+        category = expense.get("category")
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+            raise ValueError("Each expense needs a numeric amount")
+        if not isinstance(category, str):
+            raise ValueError("Each expense needs a category")
+
+        self.total_spent += amount
+        self.categories[category] = self.categories.get(category, 0) + amount
+        self.expense_count += 1
@@ -0,0 +1,207 @@
+# Expense Categorizer for Smart Budget Buddy
+# Suggests a category from an expense description: first a dictionary of known
+# merchants and keywords (merchant_categories.json, compiled into one regex),
+# then a small linear model over hashed word features, trained with NumPy on the
+# user's own categorized expenses
+
+import asyncio
+import json
+import os
+import re
+import zlib
+from collections import OrderedDict
+import numpy as np
+from search import tokenize
+
+DEFAULT_MERCHANTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "merchant_categories.json")
+
+# Used when neither the dictionary nor a confident model prediction applies
+FALLBACK_CATEGORY = "other"
+
+# Hashed feature space; index 0 is a constant (bias) feature present in every row
+FEATURE_BITS = 12
+
+# Training settings: plain full-batch gradient descent on softmax regression
+TRAINING_EPOCHS = 80
+LEARNING_RATE = 10.0
+L2_PENALTY = 1e-4
+MAX_TRAINING_ROWS = 5000
+MIN_TRAINING_ROWS = 10
+
+
+class MerchantDictionary:
+    """Known merchants and keywords, matched with one compiled regex"""
+
+    def __init__(self, categories):
+        self.categories = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                self.categories[keyword.lower()] = category
+
+        # Longest keywords first, so "uber eats" wins over "uber"
+        keywords = sorted(self.categories, key=len, reverse=True)
+        alternatives = "|".join(re.escape(keyword) for keyword in keywords)
+        self._pattern = re.compile(rf"(?<![a-z0-9])(?:{alternatives})(?![a-z0-9])") if keywords else None
+
+    def match(self, description):
+        """Return the category of the first known merchant in the description, or None"""
+        if self._pattern is None:
+            return None
+        found = self._pattern.search(" ".join(description.lower().split()))
+        return self.categories[found.group(0)] if found else None
+
+
+def load_merchants(path=None):
+    path = path or os.getenv("MERCHANT_CATEGORIES_PATH") or DEFAULT_MERCHANTS_PATH
+    with open(path) as f:
+        return MerchantDictionary(json.load(f))
+
+
+def hash_feature(feature):
+    # crc32 rather than hash(), which changes between processes
+    return zlib.crc32(feature.encode()) % ((1 << FEATURE_BITS) - 1) + 1
+
+
+def featurize(descriptions):
+    """Sparse rows of hashed word and word-pair features: (columns, values, row starts)"""
+    columns, values, starts = [], [], []
+    for description in descriptions:
+        tokens = tokenize(description)
+        features = {0}
+        features.update(hash_feature(f"w:{token}") for token in tokens)
+        features.update(hash_feature(f"b:{a} {b}") for a, b in zip(tokens, tokens[1:]))
+        starts.append(len(columns))
+        columns.extend(features)
+        values.extend([1 / np.sqrt(len(features))] * len(features))
+    return np.array(columns, dtype=np.int64), np.array(values), np.array(starts, dtype=np.int64)
+
+
+def softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class CategoryModel:
+    """Softmax regression over hashed features"""
+
+    def __init__(self, classes, weights):
+        self.classes = classes
+        self.weights = weights
+
+    @classmethod
+    def fit(cls, descriptions, labels, classes):
+        """Train on descriptions with integer labels indexing into classes"""
+        columns, values, starts = featurize(descriptions)
+        rows = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(columns))))
+        targets = np.eye(len(classes))[labels]
+        weights = np.zeros((1 << FEATURE_BITS, len(classes)))
+
+        for _ in range(TRAINING_EPOCHS):
+            logits = np.add.reduceat(weights[columns] * values[:, None], starts)
+            errors = (softmax(logits) - targets) / len(starts)
+            # X^T @ errors, one bincount per class instead of a dense feature matrix
+            gradient = np.column_stack([
+                np.bincount(columns, weights=values * errors[rows, k], minlength=len(weights))
+                for k in range(len(classes))
+            ])
+            weights -= LEARNING_RATE * (gradient + L2_PENALTY * weights)
+        return cls(classes, weights)
+
+    def predict(self, descriptions):
+        """(categories, confidences) for a batch of descriptions"""
+        columns, values, starts = featurize(descriptions)
+        probabilities = softmax(np.add.reduceat(self.weights[columns] * values[:, None], starts))
+        best = probabilities.argmax(axis=1)
+        return self.classes[best], probabilities[np.arange(len(best)), best]
+
+
+class Categorizer:
+    """Suggest categories from descriptions, with one model per user refit as their data grows"""
+
+    def __init__(self, merchants, min_confidence=0.5, refit_every=25, max_models=1000):
+        self.merchants = merchants
+        self.min_confidence = min_confidence
+        self.refit_every = refit_every
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._fitting = set()
+
+    def model_for(self, store):
+        """The tenant's current model, refit in the background once `refit_every` changes have happened
+
+        Until a refit finishes, the previous model (or none, at first) keeps being used,
+        so a fit never holds up the request that triggered it.
+        """
+        entry = self._models.get(store.tenant)
+        stale = entry is None or store.version - entry[0] >= self.refit_every or store.version < entry[0]
+        if stale and store.tenant not in self._fitting:
+            self._start_fit(store)
+            entry = self._models.get(store.tenant)
+        if entry is None:
+            return None
+        self._models.move_to_end(store.tenant)
+        return entry[1]
+
+    def _start_fit(self, store):
+        tenant, version = store.tenant, store.version
+        data = self._training_data(store)
+        if data is None:
+            self._set_model(tenant, version, None)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Outside the server (scripts), just fit here
+            self._set_model(tenant, version, CategoryModel.fit(*data))
+            return
+
+        self._fitting.add(tenant)
+        future = loop.run_in_executor(None, CategoryModel.fit, *data)
+        future.add_done_callback(lambda done: self._finish_fit(tenant, version, done))
+
+    def _finish_fit(self, tenant, version, future):
+        self._fitting.discard(tenant)
+        if future.cancelled() or future.exception() is not None:
+            # Keep the previous model; the next request tries again
+            return
+        self._set_model(tenant, version, future.result())
+
+    def _set_model(self, tenant, version, model):
+        self._models[tenant] = (version, model)
+        self._models.move_to_end(tenant)
+        while len(self._models) > self.max_models:
+            self._models.popitem(last=False)
+
+    def _training_data(self, store):
+        """(descriptions, labels, classes) copied from the store, or None if there is too little to learn from"""
+        columns = store.columns()
+        # Learn from the most recent expenses
+        rows = np.flatnonzero(columns.live)[-MAX_TRAINING_ROWS:]
+        labels = columns.category_codes[rows]
+        if len(rows) < MIN_TRAINING_ROWS or len(np.unique(labels)) < 2:
+            return None
+        return columns.descriptions[rows].tolist(), labels, columns.category_names.copy()
+
+    def suggest(self, store, descriptions):
+        """One {"category", "confidence", "source"} suggestion per description"""
+        suggestions = [None] * len(descriptions)
+        unmatched = []
+        for index, description in enumerate(descriptions):
+            category = self.merchants.match(description)
+            if category is not None:
+                suggestions[index] = {"category": category, "confidence": 1.0, "source": "merchant"}
+            else:
+                unmatched.append(index)
+
+        model = self.model_for(store) if unmatched else None
+        if model is not None:
+            categories, confidences = model.predict([descriptions[index] for index in unmatched])
+            for index, category, confidence in zip(unmatched, categories.tolist(), confidences.tolist()):
+                if confidence >= self.min_confidence:
+                    suggestions[index] = {"category": category, "confidence": round(confidence, 3), "source": "model"}
+
+        for index in range(len(suggestions)):
+            if suggestions[index] is None:
+                suggestions[index] = {"category": FALLBACK_CATEGORY, "confidence": 0.0, "source": "fallback"}
+        return suggestions
@@ -0,0 +1,174 @@
+# Expense Columns for Smart Budget Buddy
+# Column-oriented NumPy arrays of one partition's expenses, kept up to date on
+# every write. Filters, time series and the Arrow export work on whole arrays
+# instead of looping over dicts
+
+import warnings
+from datetime import date, timedelta
+import numpy as np
+
+
+def parse_dates(values):
+    """Parse ISO date strings into datetime64[us]; unparseable dates become NaT"""
+    with warnings.catch_warnings():
+        # Offsets like "Z" from the browser are converted to UTC, which is what we want
+        warnings.simplefilter("ignore", UserWarning)
+        try:
+            return np.array(values, dtype="datetime64[us]")
+        except ValueError:
+            return np.array([parse_date(value) for value in values], dtype="datetime64[us]")
+
+
+def parse_date(value):
+    """Parse one ISO date string into datetime64[us], or NaT"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        try:
+            return np.datetime64(value, "us")
+        except (ValueError, TypeError):
+            return np.datetime64("NaT", "us")
+
+
+def date_bounds(start_date=None, end_date=None):
+    """Turn inclusive ISO date filters into [start, end) datetime64 bounds
+
+    A date-only end_date includes that whole day. Raises ValueError for bad dates.
+    """
+    start = end = None
+    if start_date:
+        start = np.datetime64(date.fromisoformat(start_date[:10]) if len(start_date) == 10 else start_date, "us")
+    if end_date:
+        if len(end_date) == 10:
+            end = np.datetime64(date.fromisoformat(end_date) + timedelta(days=1), "us")
+        else:
+            end = np.datetime64(end_date, "us") + np.timedelta64(1, "us")
+    return start, end
+
+
+class ExpenseColumns:
+    """Expenses stored as parallel arrays, in the partition's insertion order
+
+    The arrays are append-only: a new expense is written into spare capacity
+    (doubled when full) and a deleted one is only marked in `live`, so writes
+    never rebuild the columns. Deleted rows are dropped in one pass once they
+    make up half of the arrays. The public arrays are views of the used rows;
+    `mask` leaves out deleted ones.
+    """
+
+    def __init__(self, expenses):
+        count = len(expenses)
+        self.size = count
+        self._ids = np.fromiter((e["id"] for e in expenses), dtype=np.int64, count=count)
+        self._amounts = np.fromiter((e["amount"] for e in expenses), dtype=np.float64, count=count)
+        self._dates = parse_dates([e["date"] for e in expenses])
+        self._descriptions = np.array([e["description"] for e in expenses], dtype=object)
+        self._live = np.ones(count, dtype=bool)
+        self.deleted = 0
+
+        # Categories are dictionary-encoded: names in first-seen order plus one code per expense
+        names, first_rows, codes = np.unique(
+            np.array([e["category"] for e in expenses], dtype=object), return_index=True, return_inverse=True
+        )
+        order = np.argsort(first_rows)
+        self._names = names[order].tolist()
+        self._codes = np.argsort(order).astype(np.int32)[codes] if count else np.zeros(0, dtype=np.int32)
+        self._name_codes = {name: code for code, name in enumerate(self._names)}
+        self._names_array = None
+
+        self._rows = dict(zip(self._ids.tolist(), range(count)))
+
+    def __len__(self):
+        return self.size - self.deleted
+
+    @property
+    def ids(self):
+        return self._ids[:self.size]
+
+    @property
+    def amounts(self):
+        return self._amounts[:self.size]
+
+    @property
+    def dates(self):
+        return self._dates[:self.size]
+
+    @property
+    def descriptions(self):
+        return self._descriptions[:self.size]
+
+    @property
+    def category_codes(self):
+        return self._codes[:self.size]
+
+    @property
+    def live(self):
+        return self._live[:self.size]
+
+    @property
+    def category_names(self):
+        if self._names_array is None:
+            self._names_array = np.array(self._names, dtype=object)
+        return self._names_array
+
+    def append(self, expense):
+        """Add one expense in amortized O(1)"""
+        if self.size == len(self._ids):
+            self._resize(max(16, 2 * self.size))
+        row = self.size
+        self._ids[row] = expense["id"]
+        self._amounts[row] = expense["amount"]
+        self._dates[row] = parse_date(expense["date"])
+        self._descriptions[row] = expense["description"]
+        self._codes[row] = self._code_for(expense["category"])
+        self._live[row] = True
+        self._rows[expense["id"]] = row
+        self.size += 1
+
+    def remove(self, expense_id):
+        row = self._rows.pop(expense_id, None)
+        if row is None:
+            return
+        self._live[row] = False
+        self.deleted += 1
+        if self.deleted > 1024 and self.deleted * 2 > self.size:
+            self._compact()
+
+    def category_code(self, category):
+        """Return the code for a category name, or -1 if no expense uses it"""
+        return self._name_codes.get(category, -1)
+
+    def mask(self, category=None, start=None, end=None):
+        """Boolean mask of the live expenses matching the filters"""
+        mask = self.live.copy()
+        if category is not None:
+            mask &= self.category_codes == self.category_code(category)
+        if start is not None:
+            mask &= self.dates >= start
+        if end is not None:
+            mask &= self.dates < end
+        return mask
+
+    def _code_for(self, category):
+        code = self._name_codes.get(category)
+        if code is None:
+            code = self._name_codes[category] = len(self._names)
+            self._names.append(category)
+            self._names_array = None
+        return code
+
+    def _resize(self, capacity):
+        # New arrays rather than resizing in place, so views handed out earlier stay valid
+        for name in ("_ids", "_amounts", "_dates", "_descriptions", "_codes", "_live"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype) if old.dtype != object else np.empty(capacity, dtype=object)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _compact(self):
+        keep = np.flatnonzero(self.live)
+        for name in ("_ids", "_amounts", "_dates", "_descriptions", "_codes"):
+            setattr(self, name, getattr(self, name)[keep])
+        self.size = len(keep)
+        self._live = np.ones(self.size, dtype=bool)
+        self.deleted = 0
+        self._rows = dict(zip(self._ids.tolist(), range(self.size)))
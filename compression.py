@@ -0,0 +1,173 @@
+# Response Compression for Smart Budget Buddy
+# Negotiates gzip, brotli or zstd from Accept-Encoding for responses above a size
+# threshold, and caches serialized collection payloads together with their
+# compressed variants so repeated GETs don't pay the compression cost again
+
+import gzip
+from starlette.responses import Response
+from lru import LRUCache
+
+# brotli and zstandard are optional - gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Preferred order when the client accepts several encodings equally
+PREFERRED_ENCODINGS = [
+    encoding for encoding, available in [("zstd", zstandard), ("br", brotli), ("gzip", gzip)] if available
+]
+
+
+def compress(body, encoding):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header, or None"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in PREFERRED_ENCODINGS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compress complete (non-streaming) responses of at least minimum_size bytes"""
+
+    def __init__(self, app, minimum_size=1000):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                # Leave already-encoded responses and event streams alone
+                if b"content-encoding" in headers or content_type.startswith(b"text/event-stream"):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                if len(chunks) == 1:
+                    # Streaming body: send it through uncompressed
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    chunks.clear()
+                return
+
+            body = b"".join(chunks)
+            headers = [
+                (name, value) for name, value in start_message.get("headers", [])
+                if name not in (b"content-length", b"vary")
+            ]
+            vary = [value for name, value in start_message.get("headers", []) if name == b"vary"]
+            headers.append((b"vary", add_vary(b", ".join(vary), b"Accept-Encoding")))
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(body)).encode()))
+
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
+
+def add_vary(vary, field):
+    """Add a field to a Vary header value, keeping the fields already listed"""
+    fields = [item.strip() for item in vary.split(b",") if item.strip()]
+    if b"*" not in fields and field.lower() not in (item.lower() for item in fields):
+        fields.append(field)
+    return b", ".join(fields)
+
+
+class CachedPayload:
+    """A serialized payload plus its compressed variants, built on first use"""
+
+    def __init__(self, body, media_type="application/json"):
+        self.body = body
+        self.media_type = media_type
+        self._variants = {}
+
+    def variant(self, encoding):
+        if encoding not in self._variants:
+            self._variants[encoding] = compress(self.body, encoding)
+        return self._variants[encoding]
+
+    def response(self, accept_encoding, minimum_size=1000):
+        """Build a response, using a precompressed variant when the client accepts one"""
+        encoding = choose_encoding(accept_encoding) if len(self.body) >= minimum_size else None
+        headers = {"Vary": "Accept, Accept-Encoding"}
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+
+        headers["Content-Encoding"] = encoding
+        return Response(self.variant(encoding), media_type=self.media_type, headers=headers)
+
+
+class PayloadCache(LRUCache):
+    """LRU cache of serialized payloads, each tagged with the data version it was built from"""
+
+    def __init__(self, max_entries=1024):
+        super().__init__(max_entries)
+
+    def get_or_build(self, key, version, build):
+        """Return the cached payload for key, rebuilding it when the version has changed"""
+        entry = self.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, build())
+            self.set(key, entry)
+        return entry[1]
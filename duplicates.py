@@ -0,0 +1,67 @@
+# Duplicate Detection for Smart Budget Buddy
+# A hash index over (day, amount in cents, normalized description) that finds
+# double-posted expenses with a few dictionary lookups per row, and a cache of
+# Idempotency-Key responses so a retried request doesn't create anything twice
+
+import hashlib
+import json
+from lru import LRUCache
+from recurring import recurring_key
+from windows import day_number
+
+# Expenses this many days apart still count as duplicates (statements post late)
+DUPLICATE_DAY_SLACK = 1
+
+DUPLICATE_POLICIES = ("flag", "reject", "allow")
+
+
+def duplicate_key(day, amount, description):
+    return (day, round(amount * 100), recurring_key(description))
+
+
+class DuplicateIndex:
+    """Expense ids by duplicate key, for one partition"""
+
+    def __init__(self):
+        self.keys = {}
+
+    def add(self, expense):
+        key = self._key(expense)
+        if key is not None:
+            self.keys.setdefault(key, set()).add(expense["id"])
+
+    def remove(self, expense):
+        key = self._key(expense)
+        ids = self.keys.get(key)
+        if ids is not None:
+            ids.discard(expense["id"])
+            if not ids:
+                del self.keys[key]
+
+    def find(self, expense):
+        """Ids of stored expenses that look like the same charge, closest day first"""
+        day = day_number(expense["date"])
+        if day is None:
+            return []
+        _, cents, description = duplicate_key(day, expense["amount"], expense["description"])
+        matches = []
+        for offset in sorted(range(-DUPLICATE_DAY_SLACK, DUPLICATE_DAY_SLACK + 1), key=abs):
+            matches.extend(sorted(self.keys.get((day + offset, cents, description), ())))
+        return matches
+
+    def _key(self, expense):
+        day = day_number(expense["date"])
+        if day is None:
+            return None
+        return duplicate_key(day, expense["amount"], expense["description"])
+
+
+def request_fingerprint(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class IdempotencyKeys(LRUCache):
+    """Remembered (request fingerprint, response) per (tenant, route, Idempotency-Key), LRU with a TTL"""
+
+    def __init__(self, max_entries=10000, ttl_seconds=86400):
+        super().__init__(max_entries, ttl_seconds)
\ No newline at end of file
@@ -0,0 +1,110 @@
+# Response Encoders for Smart Budget Buddy
+# Content negotiation between JSON and MessagePack for the list and report
+# endpoints, and Apache Arrow IPC streams for analytics. Payloads are packed
+# straight from the store's dicts and cached together with their compressed
+# variants (see compression.py); Arrow batches are built from the store's
+# column arrays (see columns.py)
+
+import io
+import json
+from compression import CachedPayload
+
+# MessagePack is optional - without it every client gets JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# pyarrow is optional - without it the Arrow endpoint answers 501
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_ALIASES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def parse_accept(accept):
+    """Return {media type: quality} from an Accept header"""
+    weights = {}
+    for part in accept.split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        weights[media_type.lower()] = quality
+    return weights
+
+
+def choose_media_type(accept):
+    """Use MessagePack only when the client asks for it at least as strongly as JSON"""
+    if msgpack is None:
+        return JSON_MEDIA_TYPE
+
+    weights = parse_accept(accept)
+    msgpack_quality = max(weights.get(alias, 0.0) for alias in MSGPACK_ALIASES)
+    json_quality = weights.get(JSON_MEDIA_TYPE, 0.0)
+    if msgpack_quality > 0 and msgpack_quality >= json_quality:
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def encode_payload(content, media_type=JSON_MEDIA_TYPE):
+    """Serialize content for the negotiated media type"""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return CachedPayload(msgpack.packb(content, use_bin_type=True), MSGPACK_MEDIA_TYPE)
+
+    # Same output as FastAPI's JSONResponse
+    return CachedPayload(
+        json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    )
+
+
+def wants_arrow(accept):
+    return pa is not None and parse_accept(accept).get(ARROW_MEDIA_TYPE, 0.0) > 0
+
+
+def iter_arrow_stream(columns, mask, batch_size=65536):
+    """Yield an Arrow IPC stream of the selected expenses, one record batch at a time"""
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("amount", pa.float64()),
+        ("category", pa.dictionary(pa.int32(), pa.string())),
+        ("description", pa.string()),
+        ("date", pa.timestamp("us")),
+    ])
+    category_names = pa.array(columns.category_names.tolist(), type=pa.string())
+    rows = mask.nonzero()[0]
+    # Writes between batches can compact the columns into new arrays with rows
+    # shifted, so every batch reads the arrays the mask was made from
+    ids, amounts, dates = columns.ids, columns.amounts, columns.dates
+    descriptions, codes = columns.descriptions, columns.category_codes
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for offset in range(0, len(rows), batch_size):
+            selected = rows[offset:offset + batch_size]
+            batch = pa.record_batch([
+                pa.array(ids[selected]),
+                pa.array(amounts[selected]),
+                pa.DictionaryArray.from_arrays(pa.array(codes[selected]), category_names),
+                pa.array(descriptions[selected], type=pa.string()),
+                pa.array(dates[selected]),
+            ], schema=schema)
+            writer.write_batch(batch)
+
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+
+    # Schema (for an empty result) and end-of-stream marker
+    yield sink.getvalue()
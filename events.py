@@ -0,0 +1,82 @@
+# Live Updates for Smart Budget Buddy
+# Fans change events (new or deleted expenses, budget changes, alerts) out to the
+# WebSocket connections of the user they belong to. Each event is serialized once
+# no matter how many connections receive it, and an idle connection costs one
+# small queue
+
+import asyncio
+import json
+
+# Tells a connection's sender to close it (its client fell too far behind)
+CLOSE = None
+
+
+class EventHub:
+    """Per-tenant publish/subscribe of JSON change events"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+
+    def subscribe(self, tenant):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(tenant, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, tenant, queue):
+        queues = self._subscribers.get(tenant)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[tenant]
+
+    def connection_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, tenant, event):
+        """Queue an event for every connection of this tenant without waiting on any of them"""
+        queues = self._subscribers.get(tenant)
+        if not queues:
+            return
+
+        message = json.dumps(event)
+        for queue in list(queues):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client this far behind reconnects and reloads instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(CLOSE)
+                self.unsubscribe(tenant, queue)
+
+    async def notify(self, tenant, alert):
+        """Lets the hub act as a budget alert notifier (see alerts.py)"""
+        self.publish(tenant, alert)
+
+    async def stream(self, websocket, tenant):
+        """Send this tenant's events to an accepted WebSocket until either side closes it"""
+        queue = self.subscribe(tenant)
+
+        async def send_events():
+            while True:
+                message = await queue.get()
+                if message is CLOSE:
+                    await websocket.close(code=1013)
+                    return
+                await websocket.send_text(message)
+
+        async def wait_for_disconnect():
+            # Clients don't send anything; this just notices when they go away
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+
+        tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_for_disconnect())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.unsubscribe(tenant, queue)
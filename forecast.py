@@ -0,0 +1,192 @@
+# Spending Forecasts for Smart Budget Buddy
+# Per-category spending totals per day, week and month, kept up to date on every
+# insert and delete, and a small model fitted to each series with NumPy: simple
+# exponential smoothing, or seasonal naive when last season predicts better.
+# Fits are cached and redone only when a finished bucket changes or a new bucket
+# starts, so serving a forecast is a dictionary lookup
+
+import numpy as np
+from recurring import day_date
+from reports import bucket_labels, budget_state, TIMESERIES_BUCKETS
+from windows import day_number
+
+MAX_FORECAST_HORIZON = 24
+
+# Season length per bucket: day of week, week of year, month of year
+SEASONS = {"day": 7, "week": 52, "month": 12}
+
+# Budgets whose calendar window is one bucket
+BUCKET_PERIODS = {"week": "weekly", "month": "monthly"}
+
+# Smoothing factors tried when fitting; the one with the smallest one-step error wins
+ALPHAS = np.linspace(0.05, 1.0, 20)
+
+# Fewer finished buckets than this are forecast with their mean
+MIN_FIT_BUCKETS = 3
+
+
+def bucket_index(day, bucket):
+    """Number a day number by its bucket, as reports.bucket_indexes does for arrays"""
+    if bucket == "month":
+        current = day_date(day)
+        return (current.year - 1970) * 12 + current.month - 1
+    if bucket == "week":
+        return (day + 3) // 7
+    return day
+
+
+def bucket_days(index, bucket):
+    """(first, last) day numbers of a bucket"""
+    if bucket == "month":
+        first, following = np.array([index, index + 1], dtype="datetime64[M]").astype("datetime64[D]").astype(np.int64)
+        return int(first), int(following) - 1
+    if bucket == "week":
+        return index * 7 - 3, index * 7 + 3
+    return index, index
+
+
+def smoothing_errors(values):
+    """One-step-ahead errors of exponential smoothing for every alpha in ALPHAS, and the final levels"""
+    levels = np.full(len(ALPHAS), values[0])
+    errors = np.empty((len(values) - 1, len(ALPHAS)))
+    for step, value in enumerate(values[1:]):
+        errors[step] = value - levels
+        levels = levels + ALPHAS * errors[step]
+    return errors, levels
+
+
+def fit_series(values, season):
+    """Fit a series of finished bucket totals; the forecast covers MAX_FORECAST_HORIZON buckets"""
+    if len(values) < MIN_FIT_BUCKETS:
+        mean = float(values.mean()) if len(values) else 0.0
+        return {"model": "mean", "params": {}, "rmse": None, "history": len(values),
+                "forecast": np.full(MAX_FORECAST_HORIZON, mean)}
+
+    errors, levels = smoothing_errors(values)
+    seasonal = len(values) >= 2 * season
+    # Compare both models on the buckets seasonal naive can predict (errors[t] is for values[t + 1])
+    if seasonal:
+        errors = errors[season - 1:]
+    mse = (errors ** 2).mean(axis=0)
+    best = int(mse.argmin())
+    fit = {"model": "exponential_smoothing", "params": {"alpha": round(float(ALPHAS[best]), 2)},
+           "rmse": float(np.sqrt(mse[best])), "history": len(values),
+           "forecast": np.full(MAX_FORECAST_HORIZON, levels[best])}
+
+    if seasonal:
+        seasonal_mse = ((values[season:] - values[:-season]) ** 2).mean()
+        if seasonal_mse < mse[best]:
+            fit.update(model="seasonal_naive", params={"season": season}, rmse=float(np.sqrt(seasonal_mse)),
+                       forecast=np.resize(values[-season:], MAX_FORECAST_HORIZON))
+
+    fit["forecast"] = np.maximum(fit["forecast"], 0)
+    return fit
+
+
+class ForecastModels:
+    """Bucketed spending totals of one partition and the fits made from them
+
+    Totals are kept per (category, bucket); category None is all categories.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.fits = {}
+
+    def add(self, expense):
+        self._update(expense, expense["amount"])
+
+    def remove(self, expense):
+        self._update(expense, -expense["amount"])
+
+    def spent(self, category, bucket, index):
+        return self.totals.get((category, bucket), {}).get(index, 0.0)
+
+    def fit(self, category, bucket, current):
+        """The fit over buckets before `current`, made at most once per bucket change"""
+        key = (category, bucket)
+        if key not in self.totals:
+            # Nothing recorded (e.g. an unknown category): don't keep a fit for it
+            return fit_series(np.zeros(0), SEASONS[bucket])
+        cached = self.fits.get(key)
+        if cached is None or cached[0] != current:
+            cached = self.fits[key] = (current, self._fit(key, current))
+        return cached[1]
+
+    def _fit(self, key, current):
+        totals = self.totals.get(key, {})
+        finished = [index for index in totals if index < current]
+        first = min(finished, default=current)
+        values = np.zeros(current - first)
+        for index in finished:
+            values[index - first] = totals[index]
+        return fit_series(values, SEASONS[key[1]])
+
+    def _update(self, expense, amount):
+        day = day_number(expense["date"])
+        if day is None:
+            return
+        for bucket in TIMESERIES_BUCKETS:
+            index = bucket_index(day, bucket)
+            for category in (expense["category"], None):
+                key = (category, bucket)
+                totals = self.totals.setdefault(key, {})
+                total = totals.get(index, 0.0) + amount
+                if total > 1e-9:
+                    totals[index] = total
+                else:
+                    totals.pop(index, None)
+
+                # Spending in the current (or a future) bucket doesn't change a fit of finished buckets
+                cached = self.fits.get(key)
+                if cached is not None and index < cached[0]:
+                    del self.fits[key]
+
+
+def spending_forecast(store, category, bucket, horizon, today):
+    """Forecast spending for the current bucket and the ones after it
+
+    The current bucket's forecast is split by the days left in it, and added to
+    what is already spent to project its total and the matching budgets.
+    """
+    day = day_number(today)
+    current = bucket_index(day, bucket)
+    fit = store.forecasts.fit(category, bucket, current)
+    values = fit["forecast"][:horizon]
+
+    first, last = bucket_days(current, bucket)
+    spent = store.forecasts.spent(category, bucket, current)
+    projected = spent + values[0] * (last - day) / (last - first + 1)
+
+    budgets = []
+    if category is not None and bucket in BUCKET_PERIODS:
+        for budget in store.budgets_for(category):
+            if budget.get("period", "monthly") != BUCKET_PERIODS[bucket] or budget.get("window", "calendar") != "calendar":
+                continue
+            percentage = (projected / budget["amount"]) * 100 if budget["amount"] > 0 else 0
+            budgets.append({
+                "id": budget["id"],
+                "amount": budget["amount"],
+                "forecast_spent": round(projected, 2),
+                "forecast_percentage": round(percentage, 1),
+                "forecast_status": budget_state(percentage)
+            })
+
+    return {
+        "category": category,
+        "bucket": bucket,
+        "model": fit["model"],
+        "params": fit["params"],
+        "rmse": round(fit["rmse"], 2) if fit["rmse"] is not None else None,
+        "history_buckets": fit["history"],
+        "current": {
+            "label": bucket_labels(np.array([current]), bucket)[0],
+            "spent": round(spent, 2),
+            "projected": round(projected, 2)
+        },
+        "forecast": [
+            {"label": label, "amount": round(amount, 2)}
+            for label, amount in zip(bucket_labels(current + np.arange(horizon), bucket), values.tolist())
+        ],
+        "budgets": budgets
+    }
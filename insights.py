@@ -0,0 +1,466 @@
+# AI Insights for Smart Budget Buddy
+# This file contains the logic behind /api/ai/insights: question intent detection,
+# expense summaries, the rule-based insight builder, the model-backed insight
+# provider with its circuit breaker, a small response cache and request coalescing
+# for identical in-flight insight calls
+
+import asyncio
+import json
+import re
+import time
+from lru import LRUCache
+from test_data import get_random_ai_insight
+from rules import load_insight_rules
+
+# Compiled once at import; see insight_rules.json
+insight_rules = load_insight_rules()
+
+
+def detect_intent(question):
+    """Map a free-text question to one of the insight categories"""
+    return insight_rules.match_intent(question)
+
+
+def data_fingerprint(tenant, version, categories, expense_count):
+    """Build a hashable fingerprint of the aggregates an insight depends on"""
+    return (
+        tenant,
+        version,
+        expense_count,
+        tuple(sorted((cat, round(amount, 2)) for cat, amount in categories.items())),
+    )
+
+
+def build_insight(intent, total_spent, categories, expense_count):
+    """Build the insight response from the expense summary"""
+    # Get a random insight from the appropriate category
+    main_insight = get_random_ai_insight(intent)
+
+    # Find the highest spending category
+    if categories:
+        highest_category = max(categories, key=categories.get)
+        highest_amount = categories[highest_category]
+
+        # Add specific insights based on data
+        if highest_amount > insight_rules.highlight_top_category_above:
+            main_insight += f" Your highest spending category is {highest_category} at ${highest_amount:.2f}."
+
+    # Generate recommendations based on spending patterns
+    recommendations = insight_rules.recommend(total_spent, categories)
+
+    return {
+        "insight": main_insight,
+        "recommendations": recommendations,
+        "summary": build_summary(total_spent, categories, expense_count)
+    }
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is refusing calls to the provider"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing provider, then let a single probe through to test recovery"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self._probe_in_flight = False
+
+    def allow_request(self):
+        """Return True if a call may go through right now"""
+        if self.state == "closed":
+            return True
+
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+
+        # Half-open: only one probe at a time decides whether the circuit closes again
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    async def call(self, fn, *args, timeout=None):
+        """Run fn(*args) within the deadline, tracking the outcome"""
+        if not self.allow_request():
+            raise CircuitOpenError("Insight provider circuit is open")
+
+        try:
+            result = await asyncio.wait_for(fn(*args), timeout)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (e.g. at shutdown): says nothing about the provider, but free the probe slot
+            self._probe_in_flight = False
+            raise
+
+        self.record_success()
+        return result
+
+
+class InsightProvider:
+    """Insight provider used by the AI endpoints
+
+    Without an OpenAI client, insights come from the rule-based engine (sample
+    insights plus threshold recommendations). With a client, the model writes the
+    insight text under a per-call deadline and circuit breaker, and any failure
+    falls back to the rule-based answer marked as degraded.
+    """
+
+    def __init__(self, client=None, model="gpt-3.5-turbo", timeout_seconds=5.0, breaker=None):
+        self.client = client
+        self.model = model
+        self.timeout_seconds = timeout_seconds
+        self.breaker = breaker or CircuitBreaker()
+
+    async def generate(self, intent, total_spent, categories, expense_count):
+        response = build_insight(intent, total_spent, categories, expense_count)
+        if self.client is None:
+            return response
+
+        try:
+            response["insight"] = await self.breaker.call(
+                self._ask_model, intent, total_spent, categories, expense_count,
+                timeout=self.timeout_seconds
+            )
+        except Exception:
+            # Timeouts, API errors and an open circuit all degrade to the rule-based insight
+            response["degraded"] = True
+
+        return response
+
+    async def generate_many(self, intents, total_spent, categories, expense_count):
+        """Build insights for several intents with a single model call"""
+        if len(intents) == 1:
+            return {intents[0]: await self.generate(intents[0], total_spent, categories, expense_count)}
+
+        responses = {
+            intent: build_insight(intent, total_spent, categories, expense_count)
+            for intent in intents
+        }
+        if self.client is None:
+            return responses
+
+        try:
+            texts = await self.breaker.call(
+                self._ask_model_batch, intents, total_spent, categories, expense_count,
+                timeout=self.timeout_seconds
+            )
+        except Exception:
+            texts = {}
+
+        for intent, response in responses.items():
+            if intent in texts:
+                response["insight"] = texts[intent]
+            else:
+                response["degraded"] = True
+
+        return responses
+
+    async def stream(self, intent, total_spent, categories, expense_count):
+        """Yield ("token", text) pieces as the insight is written, then ("done", response)
+
+        The deadline covers the wait for the first token; later tokens are sent on
+        as they arrive. If the model fails before its first token, the rule-based
+        insight is streamed instead, marked as degraded.
+        """
+        response = build_insight(intent, total_spent, categories, expense_count)
+        if self.client is not None:
+            try:
+                stream, chunks, first = await self.breaker.call(
+                    self._start_stream, intent, total_spent, categories, expense_count,
+                    timeout=self.timeout_seconds
+                )
+            except Exception:
+                response["degraded"] = True
+            else:
+                parts = [first]
+                try:
+                    yield "token", first
+                    while True:
+                        text = await asyncio.wait_for(next_delta(chunks), self.timeout_seconds)
+                        if text is None:
+                            break
+                        parts.append(text)
+                        yield "token", text
+                except Exception:
+                    # The text so far has been sent; keep it, but don't cache it as a full answer
+                    self.breaker.record_failure()
+                    response["degraded"] = True
+                finally:
+                    # Also reached when the caller stops reading (client gone, generator closed)
+                    await stream.response.aclose()
+                response["insight"] = "".join(parts).strip()
+                yield "done", response
+                return
+
+        async for token in stream_insight_tokens(response["insight"]):
+            yield "token", token
+        yield "done", response
+
+    def _messages(self, intent, total_spent, categories, expense_count):
+        return [
+            {
+                "role": "system",
+                "content": "You are a friendly personal finance advisor. Answer in two or three sentences."
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Give me {intent.replace('_', ' ')}. "
+                    f"{describe_spending(total_spent, categories, expense_count)}"
+                )
+            }
+        ]
+
+    async def _ask_model(self, intent, total_spent, categories, expense_count):
+        completion = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(intent, total_spent, categories, expense_count)
+        )
+        return completion.choices[0].message.content.strip()
+
+    async def _start_stream(self, intent, total_spent, categories, expense_count):
+        """Open a streaming completion and wait for its first text: (stream, chunk iterator, first text)"""
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(intent, total_spent, categories, expense_count),
+            stream=True
+        )
+        try:
+            chunks = stream.__aiter__()
+            first = await next_delta(chunks)
+            if first is None:
+                raise ValueError("The model returned no text")
+        except BaseException:
+            # Failed, timed out or cancelled before any text: the stream doesn't close its own response
+            await stream.response.aclose()
+            raise
+        return stream, chunks, first
+
+    async def _ask_model_batch(self, intents, total_spent, categories, expense_count):
+        completion = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a friendly personal finance advisor. Reply with a JSON object "
+                        "that maps each requested topic to an answer of two or three sentences."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        f"Topics: {', '.join(intents)}. "
+                        f"{describe_spending(total_spent, categories, expense_count)}"
+                    )
+                }
+            ]
+        )
+        # A malformed reply still means the provider answered, so it degrades only the
+        # intents it didn't answer instead of counting against the circuit breaker
+        return parse_batch_reply(completion.choices[0].message.content, intents)
+
+
+def parse_batch_reply(content, intents):
+    """Answers per intent from the model's JSON reply, ignoring anything that isn't non-empty text"""
+    text = (content or "").strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        texts = json.loads(text)
+    except ValueError:
+        return {}
+    if not isinstance(texts, dict):
+        return {}
+    return {
+        intent: texts[intent].strip()
+        for intent in intents
+        if isinstance(texts.get(intent), str) and texts[intent].strip()
+    }
+
+
+async def next_delta(chunks):
+    """Next non-empty piece of text from a streaming completion, or None at the end"""
+    async for chunk in chunks:
+        if chunk.choices and chunk.choices[0].delta.content:
+            return chunk.choices[0].delta.content
+    return None
+
+
+def describe_spending(total_spent, categories, expense_count):
+    """Describe the expense summary in a sentence for the model prompt"""
+    breakdown = ", ".join(f"{cat}: ${amount:.2f}" for cat, amount in sorted(categories.items()))
+    return f"I spent ${total_spent:.2f} across {expense_count} expenses. By category: {breakdown or 'none'}."
+
+
+def build_summary(total_spent, categories, expense_count):
+    """Summary statistics returned alongside every insight"""
+    return {
+        "total_spent": total_spent,
+        "top_category": max(categories, key=categories.get) if categories else "No expenses",
+        "expense_count": expense_count
+    }
+
+
+def describe_anomaly(anomaly):
+    """One sentence about a spending anomaly"""
+    category = anomaly["category"].capitalize()
+    if anomaly["kind"] == "unusual_expense":
+        return (f"{category}: ${anomaly['amount']:.2f} for '{anomaly['description']}' is well above "
+                f"your usual ${anomaly['typical']:.2f}.")
+    return (f"{category} spending in the week of {anomaly['week_start']} (${anomaly['amount']:.2f}) "
+            f"is far above a typical week (${anomaly['typical']:.2f}).")
+
+
+def anomaly_notes(intent, anomalies, limit=3):
+    """Sentences about recent anomalies that lead a spending analysis ("" for other intents)"""
+    if intent != "spending_analysis":
+        return ""
+    return " ".join(describe_anomaly(anomaly) for anomaly in anomalies[:limit])
+
+
+def with_anomalies(response, intent, anomalies):
+    """A copy of an insight response that mentions the user's recent spending anomalies"""
+    if not anomalies:
+        return response
+    response = {**response, "anomalies": anomalies}
+    notes = anomaly_notes(intent, anomalies)
+    if notes:
+        response["insight"] = f"{notes} {response['insight']}"
+    return response
+
+
+async def stream_insight_tokens(text):
+    """Yield the insight text a word at a time, the way a model streams tokens"""
+    for token in re.findall(r"\S+\s*", text):
+        yield token
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class InsightCache(LRUCache):
+    """LRU cache with a time-to-live for insight responses"""
+
+    def __init__(self, max_size=256, ttl_seconds=300):
+        super().__init__(max_size, ttl_seconds)
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key"""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn, *args):
+        """Await fn(*args), or the identical call that is already running"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        # Shield the shared call so one caller disconnecting doesn't cancel it for the others
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class SharedStreams:
+    """Share one in-flight stream between concurrent callers with the same key
+
+    The first caller's stream runs in its own task and keeps every item it yields;
+    callers that join later replay those items and then follow along as new ones
+    arrive. The stream is cancelled if every caller leaves before it ends.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    async def join(self, key, fn, *args):
+        """Yield the items of fn(*args), or of the identical stream that is already running"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _StreamFlight(fn(*args))
+            flight.task.add_done_callback(lambda _: self._drop(key, flight))
+
+        flight.followers += 1
+        try:
+            async for item in flight.follow():
+                yield item
+        finally:
+            flight.followers -= 1
+            if flight.followers == 0 and not flight.finished:
+                self._drop(key, flight)
+                flight.task.cancel()
+
+    def _drop(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def __len__(self):
+        return len(self._flights)
+
+
+class _StreamFlight:
+    """One running stream and everything it has yielded so far"""
+
+    def __init__(self, items):
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.followers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._run(items))
+
+    async def _run(self, items):
+        try:
+            async for item in items:
+                self.items.append(item)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self):
+        seen = 0
+        while True:
+            while seen < len(self.items):
+                yield self.items[seen]
+                seen += 1
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
@@ -6,6 +6,8 @@ This script helps students understand how to work with the test data
 
 import json
 from test_data import get_sample_expenses, get_sample_budgets, SAMPLE_AI_INSIGHTS
+from reports import budget_status
+from store import TenantStore, reset_store
 
 def print_test_data_summary():
     """Print a summary of the test data"""
@@ -38,12 +40,13 @@ def print_test_data_summary():
     print("-" * 30)
     
     total_budget = 0
-    for budget in budgets:
-        spent = categories.get(budget["category"], 0)
-        percentage = (spent / budget["amount"]) * 100 if budget["amount"] > 0 else 0
-        status = "🔴 OVER" if percentage > 100 else "🟡 CLOSE" if percentage > 80 else "🟢 GOOD"
+    status_labels = {"over": "🔴 OVER", "close": "🟡 CLOSE", "good": "🟢 GOOD"}
+    store = TenantStore("summary")
+    reset_store(store)
+    for budget in budget_status(store):
+        status = status_labels[budget["status"]]
         
-        print(f"{budget['category'].capitalize():12} ${budget['amount']:7.2f} ({percentage:5.1f}%) {status}")
+        print(f"{budget['category'].capitalize():12} ${budget['amount']:7.2f} ({budget['percentage']:5.1f}%) {status}")
         total_budget += budget["amount"]
     
     print(f"{'Total':12} ${total_budget:7.2f}")
@@ -0,0 +1,55 @@
+# LRU Cache for Smart Budget Buddy
+# The bounded in-memory cache behind the insight, token, idempotency and payload
+# caches: least recently used entries are dropped first, and entries can expire
+# after a time-to-live or at a time given when they are stored
+
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """At most max_size entries, evicting the least recently used when full
+
+    With ttl_seconds, entries expire that long after being stored; set() can also
+    take an explicit expiry. Times come from `clock` (monotonic by default; pass
+    time.time for wall-clock expiries such as a token's exp).
+    """
+
+    def __init__(self, max_size, ttl_seconds=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """Return the value stored for key, or default if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at=None):
+        """Store a value, evicting the least recently used entries over max_size"""
+        if expires_at is None and self.ttl_seconds is not None:
+            expires_at = self.clock() + self.ttl_seconds
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
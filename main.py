@@ -1,18 +1,43 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, WebSocket, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import asyncio
 from dotenv import load_dotenv
-# Remove or comment out this line if you don't have OpenAI setup
-# import openai
-from datetime import datetime
-from test_data import get_sample_expenses, get_sample_budgets, get_random_ai_insight
 
-# Load environment variables
+# Load environment variables (before the local modules below read their settings)
 load_dotenv()
 
+# OpenAI is optional - without it the app uses the rule-based sample insights
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    AsyncOpenAI = None
+from datetime import datetime, date
+from auth import users_db, hash_password, verify_password, create_access_token, decode_access_token
+from compression import CompressionMiddleware, PayloadCache
+from encoders import choose_media_type, encode_payload, wants_arrow, iter_arrow_stream, ARROW_MEDIA_TYPE, pa
+from columns import date_bounds
+from reports import spending_timeseries, budget_status, budget_entry, TIMESERIES_BUCKETS
+from windows import BUDGET_PERIODS, BUDGET_WINDOWS
+from forecast import spending_forecast, MAX_FORECAST_HORIZON
+from sketches import merge_sketches, month_index
+from body_limits import BodySizeLimitMiddleware, InsightBodyParser
+from ratelimit import RateLimitMiddleware, create_token_buckets
+from store import TenantStore, DEMO_TENANT, get_store, reset_store
+from search import top_results
+from categorizer import Categorizer, load_merchants
+from duplicates import DuplicateIndex, IdempotencyKeys, request_fingerprint, DUPLICATE_POLICIES
+from alerts import BudgetAlerts, LocalNotifier, create_notifiers
+from events import EventHub
+from insights import (
+    detect_intent, data_fingerprint, build_summary, with_anomalies, anomaly_notes, stream_insight_tokens,
+    format_sse, InsightCache, SingleFlight, SharedStreams, InsightProvider, CircuitBreaker
+)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Smart Budget Buddy API",
@@ -20,6 +45,30 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Compress larger responses with gzip, brotli or zstd (whichever the client prefers)
+compression_minimum_size = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1000"))
+app.add_middleware(CompressionMiddleware, minimum_size=compression_minimum_size)
+
+# Rate limiting per user and route, with a concurrency cap on the AI endpoints
+# (added before CORS so that 429 responses still get CORS headers)
+app.add_middleware(
+    RateLimitMiddleware,
+    buckets=create_token_buckets(os.getenv("REDIS_URL")),
+    rate_per_minute=float(os.getenv("RATE_LIMIT_PER_MINUTE", "120")),
+    burst=int(os.getenv("RATE_LIMIT_BURST", "30")),
+    ai_rate_per_minute=float(os.getenv("AI_RATE_LIMIT_PER_MINUTE", "20")),
+    ai_burst=int(os.getenv("AI_RATE_LIMIT_BURST", "5")),
+    ai_max_concurrent=int(os.getenv("AI_MAX_CONCURRENT", "16"))
+)
+
+# Request body size limits; the AI insight endpoints parse their bodies as a
+# stream, so they can accept larger payloads in bounded memory
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=int(os.getenv("MAX_BODY_BYTES", str(1024 * 1024))),
+    overrides={"/api/ai/": int(os.getenv("MAX_INSIGHT_BODY_BYTES", str(50 * 1024 * 1024)))}
+)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -30,30 +79,193 @@ app.add_middleware(
 )
 
 # Security
-security = HTTPBearer()
+# auto_error is off so requests without a token can fall back to the demo partition
+security = HTTPBearer(auto_error=False)
+
+# Set ALLOW_ANONYMOUS=False to require a token on every data endpoint
+allow_anonymous = os.getenv("ALLOW_ANONYMOUS", "True").lower() == "true"
 
 # Initialize OpenAI client
+openai_api_key = os.getenv("OPENAI_API_KEY")
+openai_client = None
+if AsyncOpenAI is not None and openai_api_key and openai_api_key != "your_openai_api_key_here":
+    openai_client = AsyncOpenAI(api_key=openai_api_key)
+
+# Insight provider with a deadline per model call and a circuit breaker in front of OpenAI
+insight_provider = InsightProvider(
+    client=openai_client,
+    model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+    timeout_seconds=float(os.getenv("INSIGHT_TIMEOUT_SECONDS", "5")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("INSIGHT_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("INSIGHT_BREAKER_RESET_SECONDS", "30"))
+    )
+)
 
 # Pydantic models
 class ExpenseCreate(BaseModel):
     amount: float
-    category: str
+    category: Optional[str] = None  # suggested from the description when left out
     description: str
     date: Optional[str] = None
 
+class ExpenseBulkCreate(BaseModel):
+    expenses: List[ExpenseCreate]
+
+class CategorizeRequest(BaseModel):
+    descriptions: List[str]
+
 class BudgetCreate(BaseModel):
     category: str
     amount: float
     period: str = "monthly"
+    window: str = "calendar"
 
 class AIInsightRequest(BaseModel):
     expenses: List[dict]
     question: str
 
+class AIInsightBatchRequest(BaseModel):
+    expenses: List[dict]
+    questions: List[str]
+
+class UserCreate(BaseModel):
+    username: str
+    password: str
+
 # In-memory storage (for tutorial purposes - replace with database in production)
-# Initialize with sample data for demonstration
-expenses_db = get_sample_expenses()
-budgets_db = get_sample_budgets()
+# Every user gets their own partition in store.py; requests without a token use
+# the demo partition, which starts with the sample data
+
+# Serialized lists and reports (JSON or MessagePack, chosen from the Accept header),
+# with compressed variants built on first request
+payload_cache = PayloadCache(max_entries=int(os.getenv("PAYLOAD_CACHE_SIZE", "1024")))
+
+def cached_collection_response(request, store, name, build):
+    """Serve a collection from the payload cache, rebuilt only after the partition changes"""
+    media_type = choose_media_type(request.headers.get("accept", ""))
+    payload = payload_cache.get_or_build(
+        (store.tenant, name, media_type), store.version, lambda: encode_payload(build(), media_type)
+    )
+    return payload.response(request.headers.get("accept-encoding", ""), compression_minimum_size)
+
+async def get_current_store(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    """Resolve the caller's data partition from their bearer token"""
+    if credentials is None:
+        if not allow_anonymous:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return get_store(DEMO_TENANT)
+
+    username = decode_access_token(credentials.credentials)
+    return get_store(username)
+
+# Cache of insight responses keyed by question intent and a fingerprint of the
+# caller's partition and aggregates; the partition version changes on every write
+insight_cache = InsightCache(
+    max_size=int(os.getenv("INSIGHT_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("INSIGHT_CACHE_TTL_SECONDS", "300"))
+)
+
+# Concurrent identical insight requests share one provider call, and concurrent
+# identical insight streams share one model stream
+insight_flights = SingleFlight()
+insight_streams = SharedStreams()
+
+# Change events pushed to the dashboards connected to /ws
+event_hub = EventHub(queue_size=int(os.getenv("WS_QUEUE_SIZE", "100")))
+
+# Budget threshold alerts, checked on every new expense. Recent alerts are kept
+# in memory for GET /api/alerts and pushed over /ws; set ALERT_WEBHOOK_URL to
+# also send them out
+local_alerts = LocalNotifier(max_alerts=int(os.getenv("ALERT_HISTORY_SIZE", "50")))
+budget_alerts = BudgetAlerts(create_notifiers(local_alerts, os.getenv("ALERT_WEBHOOK_URL")) + [event_hub])
+
+# Category suggestions for expenses created without one: known merchants first,
+# then a per-user model trained on their categorized expenses
+categorizer = Categorizer(
+    load_merchants(),
+    min_confidence=float(os.getenv("CATEGORIZER_MIN_CONFIDENCE", "0.5")),
+    refit_every=int(os.getenv("CATEGORIZER_REFIT_EVERY", "25"))
+)
+
+# Responses to requests sent with an Idempotency-Key, so retries don't create twice
+idempotency_keys = IdempotencyKeys(
+    max_entries=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+)
+
+def publish_change(store, event_type, category, **fields):
+    """Push a change event with the new totals and the affected budgets to the user's dashboards"""
+    event_hub.publish(store.tenant, {
+        "type": event_type,
+        **fields,
+        "version": store.version,
+        "total_spent": round(store.total_spent(), 2),
+        "expense_count": len(store.expenses),
+        "category": category,
+        "category_total": round(store.category_totals.get(category, 0), 2),
+        "budgets": [budget_entry(store, budget) for budget in store.budgets_for(category)]
+    })
+
+async def read_insight_body(request: Request):
+    """Parse an AI insight body as it streams in, summarizing each expense on arrival"""
+    body = InsightBodyParser()
+    try:
+        async for chunk in request.stream():
+            body.feed(chunk)
+        body.close()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return body
+
+def require_field(body, name, expected_type):
+    value = body.fields.get(name)
+    if not isinstance(value, expected_type):
+        raise HTTPException(status_code=422, detail=f"Field required: {name}")
+    return value
+
+# The AI endpoints read their bodies themselves, so document the schema explicitly
+def request_body_schema(model):
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
+
+async def get_insight_responses(store, intents, total_spent, categories, expense_count):
+    """Return {intent: insight} for this data, asking the provider once for every uncached intent"""
+    # Repeated questions against unchanged data are answered from the cache
+    fingerprint = data_fingerprint(store.tenant, store.version, categories, expense_count)
+    responses = {}
+    missing = []
+    for intent in intents:
+        cached = insight_cache.get((intent, fingerprint))
+        if cached is not None:
+            responses[intent] = cached
+        else:
+            missing.append(intent)
+
+    if missing:
+        missing = tuple(sorted(set(missing)))
+        generated = await insight_flights.do(
+            (missing, fingerprint), insight_provider.generate_many,
+            missing, total_spent, categories, expense_count
+        )
+
+        # Degraded fallback answers aren't cached so the model is used again once it recovers
+        for intent, response in generated.items():
+            if not response.get("degraded"):
+                insight_cache.set((intent, fingerprint), response)
+        responses.update(generated)
+
+    # Anomalies come from the stored history, not the cached answer
+    anomalies = store.anomalies.recent_anomalies()
+    return {intent: with_anomalies(response, intent, anomalies) for intent, response in responses.items()}
+
+async def get_insight_response(store, intent, total_spent, categories, expense_count):
+    """Return the insight for this question intent and data, calling the provider at most once"""
+    responses = await get_insight_responses(store, [intent], total_spent, categories, expense_count)
+    return responses[intent]
 
 @app.get("/")
 async def root():
@@ -63,142 +275,539 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+# Authentication endpoints
+@app.post("/api/auth/register")
+async def register(user: UserCreate):
+    """Register a new user with an empty data partition"""
+    if user.username in users_db or user.username == DEMO_TENANT:
+        raise HTTPException(status_code=400, detail="Username already registered")
+
+    users_db[user.username] = {
+        "username": user.username,
+        "hashed_password": await hash_password(user.password),
+        "created_at": datetime.now().isoformat()
+    }
+    return {"message": "User registered", "username": user.username}
+
+@app.post("/api/auth/login")
+async def login(user: UserCreate):
+    """Log in and receive a bearer token"""
+    stored_user = users_db.get(user.username)
+    if stored_user is None or not await verify_password(user.password, stored_user["hashed_password"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {"access_token": create_access_token(user.username), "token_type": "bearer"}
+
+@app.get("/api/auth/profile")
+async def get_profile(store: TenantStore = Depends(get_current_store)):
+    """Get the current user's profile"""
+    return {
+        "username": store.tenant,
+        "expense_count": len(store.expenses),
+        "budget_count": len(store.budgets)
+    }
+
 # Expense endpoints
+def filter_expenses(store, category, start_date, end_date):
+    """Return the column arrays and a mask of the expenses matching the filters"""
+    try:
+        start, end = date_bounds(start_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Dates must be ISO formatted (YYYY-MM-DD)")
+    columns = store.columns()
+    return columns, columns.mask(category, start, end)
+
+def arrow_response(store, category, start_date, end_date):
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Arrow export requires the pyarrow package")
+    columns, mask = filter_expenses(store, category, start_date, end_date)
+    return StreamingResponse(iter_arrow_stream(columns, mask), media_type=ARROW_MEDIA_TYPE)
+
 @app.get("/api/expenses")
-async def get_expenses():
-    """Get all expenses"""
-    return {"expenses": expenses_db}
+async def get_expenses(
+    request: Request,
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    store: TenantStore = Depends(get_current_store)
+):
+    """Get all expenses, optionally filtered by category and date range (inclusive)"""
+    if wants_arrow(request.headers.get("accept", "")):
+        return arrow_response(store, category, start_date, end_date)
+
+    if category is None and start_date is None and end_date is None:
+        return cached_collection_response(request, store, "expenses", lambda: {"expenses": store.list_expenses()})
+
+    columns, mask = filter_expenses(store, category, start_date, end_date)
+    expenses = [store.expenses[expense_id] for expense_id in columns.ids[mask].tolist()]
+    payload = encode_payload({"expenses": expenses}, choose_media_type(request.headers.get("accept", "")))
+    return payload.response(request.headers.get("accept-encoding", ""), compression_minimum_size)
+
+@app.get("/api/expenses/search")
+async def search_expenses(
+    q: str,
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 20,
+    store: TenantStore = Depends(get_current_store)
+):
+    """Search expense descriptions (prefix and typo tolerant), best matches first"""
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=422, detail="limit must be between 1 and 500")
+
+    allowed = None
+    if category is not None or start_date is not None or end_date is not None:
+        columns, mask = filter_expenses(store, category, start_date, end_date)
+        allowed = columns.ids[mask]
+
+    ids, scores = store.search_index.search(q)
+    ids, scores, total = top_results(ids, scores, limit, allowed)
+    results = [
+        {**store.expenses[expense_id], "score": round(score, 4)}
+        for expense_id, score in zip(ids.tolist(), scores.tolist())
+    ]
+    return {"query": q, "total": total, "results": results}
+
+@app.get("/api/expenses.arrow")
+async def export_expenses_arrow(
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    store: TenantStore = Depends(get_current_store)
+):
+    """Export expenses as an Apache Arrow IPC stream (same filters as /api/expenses)"""
+    return arrow_response(store, category, start_date, end_date)
+
+def categorize_missing(store, expenses):
+    """Fill in the category of expenses created without one, in one batch; returns the suggestions used"""
+    missing = [expense for expense in expenses if not expense["category"]]
+    if not missing:
+        return []
+    suggestions = categorizer.suggest(store, [expense["description"] for expense in missing])
+    for expense, suggestion in zip(missing, suggestions):
+        expense["category"] = suggestion["category"]
+    return suggestions
+
+def insert_expense(store, expense_dict):
+    """Store an expense and return the budget alerts and spending anomalies it triggered"""
+    anomalies = store.add_expense(expense_dict)
+    alerts = budget_alerts.check(store, expense_dict)
+    budget_alerts.publish(store.tenant, alerts)
+    for anomaly in anomalies:
+        event_hub.publish(store.tenant, {"type": "spending_anomaly", **anomaly})
+    return alerts, anomalies
+
+def check_duplicate_policy(duplicates):
+    if duplicates not in DUPLICATE_POLICIES:
+        raise HTTPException(status_code=422, detail=f"duplicates must be one of: {', '.join(DUPLICATE_POLICIES)}")
+
+def find_duplicate(store, expense_dict, duplicates):
+    """Id of an existing expense this one duplicates, or None (dates must already be filled in)"""
+    if duplicates == "allow":
+        return None
+    matches = store.duplicates.find(expense_dict)
+    return matches[0] if matches else None
+
+def split_duplicates(store, expenses):
+    """Split import rows into ([(index, row)] to create, skipped duplicates)
+
+    A row repeating an earlier row of the same import is skipped too; until that
+    row is created, its entry has "duplicate_of_row" (its index) instead of an id.
+    """
+    rows, skipped = [], []
+    batch = DuplicateIndex()
+    for index, expense_dict in enumerate(expenses):
+        matches = store.duplicates.find(expense_dict)
+        if matches:
+            skipped.append({"index": index, "duplicate_of": matches[0]})
+            continue
+        earlier = batch.find(expense_dict)
+        if earlier:
+            skipped.append({"index": index, "duplicate_of_row": earlier[0]})
+            continue
+        batch.add({**expense_dict, "id": index})
+        rows.append((index, expense_dict))
+    return rows, skipped
+
+def idempotent_replay(request, store, route, payload):
+    """Look up the Idempotency-Key header: (cache key, fingerprint, stored response or None)"""
+    key = request.headers.get("idempotency-key")
+    if not key:
+        return None, None, None
+    cache_key = (store.tenant, route, key)
+    fingerprint = request_fingerprint(payload)
+    stored = idempotency_keys.get(cache_key)
+    if stored is None:
+        return cache_key, fingerprint, None
+    if stored[0] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return cache_key, fingerprint, JSONResponse(stored[1], headers={"Idempotent-Replayed": "true"})
 
 @app.post("/api/expenses")
-async def create_expense(expense: ExpenseCreate):
-    """Create a new expense"""
+async def create_expense(
+    expense: ExpenseCreate,
+    request: Request,
+    duplicates: str = "flag",
+    store: TenantStore = Depends(get_current_store)
+):
+    """Create a new expense (the category is suggested from the description if left out)
+
+    A likely double-post is flagged with duplicate_of (duplicates=flag), refused
+    with 409 (duplicates=reject) or stored as is (duplicates=allow).
+    """
+    check_duplicate_policy(duplicates)
     expense_dict = expense.model_dump()  # Changed from expense.dict()
-    expense_dict["id"] = len(expenses_db) + 1
+    cache_key, fingerprint, replay = idempotent_replay(
+        request, store, "create_expense", {"expense": expense_dict, "duplicates": duplicates}
+    )
+    if replay is not None:
+        return replay
+
     expense_dict["date"] = expense_dict["date"] or datetime.now().isoformat()
-    expenses_db.append(expense_dict)
-    return {"message": "Expense created", "expense": expense_dict}
+    duplicate_of = find_duplicate(store, expense_dict, duplicates)
+    if duplicate_of is not None:
+        if duplicates == "reject":
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "This looks like a duplicate expense", "duplicate_of": duplicate_of}
+            )
+        expense_dict["duplicate_of"] = duplicate_of
+
+    suggestions = categorize_missing(store, [expense_dict])
+    alerts, anomalies = insert_expense(store, expense_dict)
+    publish_change(store, "expense_created", expense_dict["category"], expense=expense_dict)
+
+    response = {"message": "Expense created", "expense": expense_dict, "alerts": alerts, "anomalies": anomalies}
+    if suggestions:
+        response["categorization"] = suggestions[0]
+    if cache_key is not None:
+        idempotency_keys.set(cache_key, (fingerprint, response))
+    return response
+
+@app.post("/api/expenses/bulk")
+async def import_expenses(
+    body: ExpenseBulkCreate,
+    request: Request,
+    duplicates: str = "reject",
+    store: TenantStore = Depends(get_current_store)
+):
+    """Create many expenses at once, categorizing the ones without a category in one batch
+
+    Rows that duplicate an existing expense (or an earlier row) are skipped
+    (duplicates=reject), stored with duplicate_of (duplicates=flag) or stored
+    as is (duplicates=allow).
+    """
+    check_duplicate_policy(duplicates)
+    expenses = [expense.model_dump() for expense in body.expenses]
+    cache_key, fingerprint, replay = idempotent_replay(
+        request, store, "import_expenses", {"expenses": expenses, "duplicates": duplicates}
+    )
+    if replay is not None:
+        return replay
+
+    for expense_dict in expenses:
+        expense_dict["date"] = expense_dict["date"] or datetime.now().isoformat()
+
+    # Drop the duplicates first so only the rows being created are categorized
+    rows, skipped = list(enumerate(expenses)), []
+    if duplicates == "reject":
+        rows, skipped = split_duplicates(store, expenses)
+    categorized = len(categorize_missing(store, [expense_dict for _, expense_dict in rows]))
+
+    created, alerts, anomalies = [], [], []
+    for index, expense_dict in rows:
+        duplicate_of = find_duplicate(store, expense_dict, duplicates)
+        if duplicate_of is not None:
+            expense_dict["duplicate_of"] = duplicate_of
+        expense_alerts, expense_anomalies = insert_expense(store, expense_dict)
+        alerts.extend(expense_alerts)
+        anomalies.extend(expense_anomalies)
+        created.append(expense_dict)
+
+    # Rows skipped as repeats of an earlier row in this import can now name its id
+    for entry in skipped:
+        if "duplicate_of_row" in entry:
+            entry["duplicate_of"] = expenses[entry.pop("duplicate_of_row")]["id"]
+    event_hub.publish(store.tenant, {"type": "expenses_imported", "count": len(created), "version": store.version})
+
+    response = {
+        "message": f"Imported {len(created)} expenses",
+        "created": len(created),
+        "auto_categorized": categorized,
+        "skipped_duplicates": skipped,
+        "expenses": created,
+        "alerts": alerts,
+        "anomalies": anomalies
+    }
+    if cache_key is not None:
+        idempotency_keys.set(cache_key, (fingerprint, response))
+    return response
+
+@app.post("/api/expenses/categorize")
+async def categorize_expenses(body: CategorizeRequest, store: TenantStore = Depends(get_current_store)):
+    """Suggest a category for each description without creating anything"""
+    return {"suggestions": categorizer.suggest(store, body.descriptions)}
 
 @app.delete("/api/expenses/{expense_id}")
-async def delete_expense(expense_id: int):
+async def delete_expense(expense_id: int, store: TenantStore = Depends(get_current_store)):
     """Delete an expense"""
-    global expenses_db
-    expenses_db = [e for e in expenses_db if e["id"] != expense_id]
+    expense = store.delete_expense(expense_id)
+    if expense is not None:
+        publish_change(store, "expense_deleted", expense["category"], expense_id=expense_id)
     return {"message": "Expense deleted"}
 
 # Budget endpoints
 @app.get("/api/budgets")
-async def get_budgets():
+async def get_budgets(request: Request, store: TenantStore = Depends(get_current_store)):
     """Get all budgets"""
-    return {"budgets": budgets_db}
+    return cached_collection_response(request, store, "budgets", lambda: {"budgets": store.budgets})
 
 @app.post("/api/budgets")
-async def create_budget(budget: BudgetCreate):
+async def create_budget(budget: BudgetCreate, store: TenantStore = Depends(get_current_store)):
     """Create a new budget"""
+    if budget.period not in BUDGET_PERIODS:
+        raise HTTPException(status_code=422, detail=f"period must be one of: {', '.join(BUDGET_PERIODS)}")
+    if budget.window not in BUDGET_WINDOWS:
+        raise HTTPException(status_code=422, detail=f"window must be one of: {', '.join(BUDGET_WINDOWS)}")
+
     budget_dict = budget.model_dump()  # Changed from budget.dict()
-    budget_dict["id"] = len(budgets_db) + 1
-    budgets_db.append(budget_dict)
+    store.add_budget(budget_dict)
+    publish_change(store, "budget_created", budget_dict["category"], budget_id=budget_dict["id"])
     return {"message": "Budget created", "budget": budget_dict}
 
 # AI endpoints
-@app.post("/api/ai/insights")
-async def get_ai_insights(request: AIInsightRequest):
+@app.post("/api/ai/insights", openapi_extra=request_body_schema(AIInsightRequest))
+async def get_ai_insights(request: Request, store: TenantStore = Depends(get_current_store)):
     """Get AI-powered financial insights"""
+    # Calculate some basic statistics from the expenses while the body streams in
+    body = await read_insight_body(request)
+    question = require_field(body, "question", str)
+
     try:
-        # For demonstration purposes, we'll use sample insights
-        # In production, you would call the OpenAI API here
-        
         # Analyze the user's question to provide relevant insights
-        question_lower = request.question.lower()
-        
-        if "save" in question_lower or "reduce" in question_lower:
-            insight_type = "savings_tips"
-        elif "budget" in question_lower or "recommend" in question_lower:
-            insight_type = "budget_recommendations"
-        else:
-            insight_type = "spending_analysis"
-        
-        # Get a random insight from the appropriate category
-        main_insight = get_random_ai_insight(insight_type)
-        
-        # Calculate some basic statistics from current expenses
-        total_spent = sum(expense["amount"] for expense in request.expenses)
-        categories = {}
-        for expense in request.expenses:
-            cat = expense["category"]
-            categories[cat] = categories.get(cat, 0) + expense["amount"]
-        
-        # Find the highest spending category
-        if categories:
-            highest_category = max(categories, key=categories.get)
-            highest_amount = categories[highest_category]
-            
-            # Add specific insights based on data
-            if highest_amount > 200:
-                main_insight += f" Your highest spending category is {highest_category} at ${highest_amount:.2f}."
-        
-        # Generate recommendations based on spending patterns
-        recommendations = []
-        
-        if total_spent > 1000:
-            recommendations.append("Consider setting up automatic savings to build an emergency fund")
-        
-        if categories.get("food", 0) > 300:
-            recommendations.append("Try meal planning to reduce food expenses by 15-20%")
-        
-        if categories.get("entertainment", 0) > 150:
-            recommendations.append("Look for free entertainment options like parks, libraries, or community events")
-        
-        if categories.get("shopping", 0) > 200:
-            recommendations.append("Implement a 24-hour rule before making non-essential purchases")
-        
-        if not recommendations:
-            recommendations = [
-                "Great job managing your expenses!",
-                "Consider automating your savings to reach your financial goals faster",
-                "Track your spending weekly to stay on top of your budget"
-            ]
-        
+        intent = detect_intent(question)
+
+        return await get_insight_response(store, intent, body.total_spent, body.categories, body.expense_count)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
+
+@app.post("/api/ai/insights/batch", openapi_extra=request_body_schema(AIInsightBatchRequest))
+async def get_ai_insights_batch(request: Request, store: TenantStore = Depends(get_current_store)):
+    """Answer several questions with one pass over the expenses"""
+    # Calculate the statistics once and share them between all questions
+    body = await read_insight_body(request)
+    questions = require_field(body, "questions", list)
+    if not all(isinstance(question, str) for question in questions):
+        raise HTTPException(status_code=422, detail="questions must be a list of strings")
+    total_spent, categories, expense_count = body.total_spent, body.categories, body.expense_count
+
+    try:
+        intents = [detect_intent(question) for question in questions]
+        responses = await get_insight_responses(store, intents, total_spent, categories, expense_count)
+
+        answers = []
+        for question, intent in zip(questions, intents):
+            answer = {"question": question, **responses[intent]}
+            del answer["summary"]
+            answers.append(answer)
+
         return {
-            "insight": main_insight,
-            "recommendations": recommendations[:3],  # Limit to 3 recommendations
-            "summary": {
-                "total_spent": total_spent,
-                "top_category": max(categories, key=categories.get) if categories else "No expenses",
-                "expense_count": len(request.expenses)
-            }
+            "answers": answers,
+            "summary": build_summary(total_spent, categories, expense_count)
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
+@app.post("/api/ai/insights/stream", openapi_extra=request_body_schema(AIInsightRequest))
+async def stream_ai_insights(request: Request, store: TenantStore = Depends(get_current_store)):
+    """Stream AI-powered financial insights as Server-Sent Events"""
+    body = await read_insight_body(request)
+    intent = detect_intent(require_field(body, "question", str))
+    total_spent, categories, expense_count = body.total_spent, body.categories, body.expense_count
+
+    async def event_stream():
+        # The summary is known before any insight text, so send it straight away
+        yield format_sse("summary", build_summary(total_spent, categories, expense_count))
+
+        try:
+            fingerprint = data_fingerprint(store.tenant, store.version, categories, expense_count)
+            anomalies = store.anomalies.recent_anomalies()
+            cached = insight_cache.get((intent, fingerprint))
+            if cached is not None:
+                response = with_anomalies(cached, intent, anomalies)
+                async for token in stream_insight_tokens(response["insight"]):
+                    yield format_sse("token", token)
+                    await asyncio.sleep(0)
+            else:
+                notes = anomaly_notes(intent, anomalies)
+                if notes:
+                    async for token in stream_insight_tokens(f"{notes} "):
+                        yield format_sse("token", token)
+
+                # Forward the model's text as it is written, then cache the assembled answer.
+                # Dashboards asking the same question of the same data follow one model stream
+                async for kind, value in insight_streams.join(
+                    (intent, fingerprint), insight_provider.stream,
+                    intent, total_spent, categories, expense_count
+                ):
+                    if kind == "token":
+                        yield format_sse("token", value)
+                        await asyncio.sleep(0)
+                    else:
+                        response = value
+                if not response.get("degraded"):
+                    insight_cache.set((intent, fingerprint), response)
+
+            yield format_sse("recommendations", response["recommendations"])
+            yield format_sse("done", {})
+        except Exception as e:
+            yield format_sse("error", {"detail": f"AI service error: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/reports/monthly")
-async def get_monthly_report():
+async def get_monthly_report(request: Request, store: TenantStore = Depends(get_current_store)):
     """Get monthly spending report"""
-    # Calculate totals by category
-    category_totals = {}
-    for expense in expenses_db:
-        category = expense["category"]
-        amount = expense["amount"]
-        category_totals[category] = category_totals.get(category, 0) + amount
-    
+    return cached_collection_response(request, store, "monthly_report", lambda: build_monthly_report(store))
+
+def build_monthly_report(store):
+    # Category totals are kept up to date on every write, so no scan is needed
+    category_totals = dict(store.category_totals)
     total_spent = sum(category_totals.values())
-    
+
     return {
         "total_spent": total_spent,
         "category_breakdown": category_totals,
-        "expense_count": len(expenses_db)
+        "category_distribution": store.sketches.category_summaries(),
+        "expense_count": len(store.expenses)
     }
 
+@app.get("/api/reports/distribution")
+async def get_distribution_report(
+    request: Request,
+    category: Optional[str] = None,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    store: TenantStore = Depends(get_current_store)
+):
+    """Get the median, p90 and p99 expense size overall and per month"""
+    try:
+        first, last = month_index(start_month), month_index(end_month)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Months must be formatted YYYY-MM")
+
+    def build():
+        # Month sketches merge into the range's sketch without revisiting any expense
+        selected = store.sketches.select(category, first, last)
+        return {
+            "category": category,
+            "overall": merge_sketches(sketch for _, sketch in selected).summary(),
+            "months": store.sketches.monthly_summaries(category, first, last)
+        }
+
+    return cached_collection_response(
+        request, store, ("distribution", category, start_month, end_month), build
+    )
+
+@app.get("/api/reports/timeseries")
+async def get_timeseries_report(
+    request: Request,
+    bucket: str = "month",
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    store: TenantStore = Depends(get_current_store)
+):
+    """Get spending per day, week or month"""
+    if bucket not in TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=422, detail=f"bucket must be one of: {', '.join(TIMESERIES_BUCKETS)}")
+
+    def build():
+        columns, mask = filter_expenses(store, category, start_date, end_date)
+        return {"bucket": bucket, "category": category, **spending_timeseries(columns, mask, bucket)}
+
+    return cached_collection_response(
+        request, store, ("timeseries", bucket, category, start_date, end_date), build
+    )
+
+@app.get("/api/forecast")
+async def get_forecast(
+    category: Optional[str] = None,
+    horizon: int = 3,
+    bucket: str = "month",
+    store: TenantStore = Depends(get_current_store)
+):
+    """Forecast spending for this day, week or month and the next ones"""
+    if bucket not in TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=422, detail=f"bucket must be one of: {', '.join(TIMESERIES_BUCKETS)}")
+    if not 1 <= horizon <= MAX_FORECAST_HORIZON:
+        raise HTTPException(status_code=422, detail=f"horizon must be between 1 and {MAX_FORECAST_HORIZON}")
+    return spending_forecast(store, category, bucket, horizon, date.today())
+
+@app.get("/api/recurring")
+async def get_recurring(request: Request, store: TenantStore = Depends(get_current_store)):
+    """Get recurring charges (subscriptions, bills) detected in your expenses"""
+    return cached_collection_response(
+        request, store, "recurring", lambda: {"recurring": store.recurring.detected()}
+    )
+
+@app.get("/api/reports/budget-status")
+async def get_budget_status(request: Request, store: TenantStore = Depends(get_current_store)):
+    """Get spent, remaining and status for every budget in its current period"""
+    # Windows move with the calendar, so the cached payload is only good for today
+    today = date.today()
+    return cached_collection_response(
+        request, store, ("budget_status", today.isoformat()),
+        lambda: {"budgets": budget_status(store, today)}
+    )
+
+@app.get("/api/alerts")
+async def get_alerts(store: TenantStore = Depends(get_current_store)):
+    """Get your most recent budget alerts, newest first"""
+    return {"alerts": local_alerts.recent(store.tenant)}
+
+@app.get("/api/anomalies")
+async def get_anomalies(store: TenantStore = Depends(get_current_store)):
+    """Get your most recent spending anomalies, newest first"""
+    return {"anomalies": store.anomalies.recent_anomalies()}
+
+@app.websocket("/ws")
+async def live_updates(websocket: WebSocket, token: Optional[str] = None):
+    """Push change events for your data; browsers pass the bearer token as ?token="""
+    if token:
+        try:
+            tenant = decode_access_token(token)
+        except HTTPException:
+            await websocket.close(code=1008)
+            return
+    elif allow_anonymous:
+        tenant = DEMO_TENANT
+    else:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    await event_hub.stream(websocket, tenant)
+
 @app.post("/api/reset-data")
-async def reset_test_data():
-    """Reset the application to use sample test data"""
-    global expenses_db, budgets_db
-    expenses_db = get_sample_expenses()
-    budgets_db = get_sample_budgets()
+async def reset_test_data(store: TenantStore = Depends(get_current_store)):
+    """Reset your data to the sample test data"""
+    reset_store(store)
+    event_hub.publish(store.tenant, {"type": "data_reset", "version": store.version})
     return {
         "message": "Test data has been reset",
-        "expenses_count": len(expenses_db),
-        "budgets_count": len(budgets_db)
+        "expenses_count": len(store.expenses),
+        "budgets_count": len(store.budgets)
     }
 
 @app.get("/api/sample-questions")
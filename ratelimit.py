@@ -0,0 +1,161 @@
+# Rate Limiting for Smart Budget Buddy
+# Token-bucket rate limits per user and route, plus a cap on how many requests to
+# the expensive AI endpoints may run at once. Requests over either limit get a
+# 429 with a Retry-After header instead of queueing up behind the others
+
+import math
+import re
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from auth import decode_access_token
+
+# Redis is optional - without it the buckets live in this process
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+# Numeric path segments share one bucket, e.g. /api/expenses/{id}
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class TokenBuckets:
+    """In-process token buckets, evicting the least recently used keys when full"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key, rate, burst):
+        """Take one token; return 0 if allowed, otherwise the seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        wait = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisTokenBuckets:
+    """Token buckets kept in a Redis-compatible server, shared by every instance"""
+
+    # Refill and take in one atomic step on the server
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url):
+        self.client = redis.from_url(url)
+        self._take = self.client.register_script(self.SCRIPT)
+
+    async def take(self, key, rate, burst):
+        try:
+            wait = await self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()])
+        except Exception:
+            # If Redis is unreachable, let the request through rather than failing it
+            return 0
+        return float(wait)
+
+
+def create_token_buckets(redis_url=None):
+    """Use Redis when a URL is configured and the package is installed"""
+    if redis_url and redis is not None:
+        return RedisTokenBuckets(redis_url)
+    return TokenBuckets()
+
+
+def too_many_requests(retry_after, detail="Too many requests"):
+    return JSONResponse(
+        {"detail": detail},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class RateLimitMiddleware:
+    """Per-user, per-route token buckets and a concurrency cap on the AI endpoints"""
+
+    def __init__(self, app, buckets, rate_per_minute=120, burst=30,
+                 ai_rate_per_minute=20, ai_burst=5, ai_max_concurrent=16,
+                 ai_prefix="/api/ai/"):
+        self.app = app
+        self.buckets = buckets
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.ai_rate = ai_rate_per_minute / 60
+        self.ai_burst = ai_burst
+        self.ai_max_concurrent = ai_max_concurrent
+        self.ai_prefix = ai_prefix
+        self.ai_in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        is_ai = path.startswith(self.ai_prefix)
+        rate, burst = (self.ai_rate, self.ai_burst) if is_ai else (self.rate, self.burst)
+
+        key = f"{client_key(scope)}:{scope['method']}:{ID_SEGMENT.sub('/{id}', path)}"
+        wait = await self.buckets.take(key, rate, burst)
+        if wait > 0:
+            await too_many_requests(wait)(scope, receive, send)
+            return
+
+        if not is_ai:
+            await self.app(scope, receive, send)
+            return
+
+        # Shed load instead of queueing when too many AI requests are already running
+        if self.ai_in_flight >= self.ai_max_concurrent:
+            await too_many_requests(1, "Server busy, please retry")(scope, receive, send)
+            return
+
+        self.ai_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.ai_in_flight -= 1
+
+
+def client_key(scope):
+    """Rate limit key: the username for valid tokens, otherwise the client address"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    return f"user:{decode_access_token(token)}"
+                except HTTPException:
+                    pass
+            break
+
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
@@ -0,0 +1,185 @@
+# Recurring Expenses for Smart Budget Buddy
+# Groups expenses by normalized description, looks for a regular interval between
+# charges (weekly ... yearly) with steady amounts, and projects the next charges.
+# Groups are re-analyzed only when one of their expenses changes, so a new
+# expense never causes a rescan of the whole history
+
+import calendar
+from bisect import bisect_left
+from datetime import date, timedelta
+import numpy as np
+from search import tokenize
+from windows import day_number
+
+EPOCH = date(1970, 1, 1)
+
+# Nominal period lengths in days; months are added on the calendar when projecting
+PERIOD_DAYS = {"weekly": 7, "biweekly": 14, "monthly": 30.44, "quarterly": 91.31, "yearly": 365.25}
+PERIOD_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+# A median interval within this fraction of a nominal period counts as that period
+PERIOD_TOLERANCE = 0.15
+
+# Share of intervals (and amounts) that must agree with the median
+MIN_REGULARITY = 0.6
+INTERVAL_SLACK_DAYS = 2
+AMOUNT_TOLERANCE = 0.2
+
+MIN_OCCURRENCES = 3
+
+# A series with no charge for this many periods is treated as cancelled
+MAX_MISSED_PERIODS = 2
+
+# Descriptions that announce a recurring charge, assumed monthly until there is history
+RECURRING_WORDS = {"subscription", "membership", "bill", "rent", "insurance", "premium", "plan"}
+KEYWORD_CONFIDENCE = 0.3
+
+
+def recurring_key(description):
+    """Normalized description: lowercase words without reference numbers"""
+    return " ".join(token for token in tokenize(description) if not token.isdigit())
+
+
+def day_date(day):
+    return EPOCH + timedelta(days=int(day))
+
+
+def add_period(day, period, interval):
+    """Day number of the charge after `day`"""
+    months = PERIOD_MONTHS.get(period)
+    if months is None:
+        return day + interval
+    current = day_date(day)
+    month_index = current.month - 1 + months
+    year, month = current.year + month_index // 12, month_index % 12 + 1
+    return day_number(date(year, month, min(current.day, calendar.monthrange(year, month)[1])))
+
+
+class RecurringSeries:
+    """All expenses sharing a normalized description, kept sorted by day"""
+
+    def __init__(self):
+        self.days = []
+        self.amounts = []
+        self.ids = []
+        self.category = None
+        self.description = None
+
+    def add(self, expense, day):
+        index = bisect_left(self.days, day)
+        self.days.insert(index, day)
+        self.amounts.insert(index, expense["amount"])
+        self.ids.insert(index, expense["id"])
+        if index == len(self.days) - 1:
+            self.category = expense["category"]
+            self.description = expense["description"]
+
+    def remove(self, expense_id):
+        index = self.ids.index(expense_id)
+        del self.days[index], self.amounts[index], self.ids[index]
+
+    def analyze(self, key):
+        """Describe the series if it looks recurring, otherwise return None"""
+        if not self.days:
+            return None
+        days = np.array(self.days)
+        amounts = np.array(self.amounts)
+        amount = float(np.median(amounts))
+
+        if len(days) < MIN_OCCURRENCES:
+            if not RECURRING_WORDS.intersection(key.split()):
+                return None
+            return self._describe("monthly", PERIOD_DAYS["monthly"], amount, KEYWORD_CONFIDENCE, "keyword")
+
+        # Several charges on one day (e.g. split payments) count as one interval
+        intervals = np.diff(days)
+        intervals = intervals[intervals > 0]
+        if not len(intervals):
+            return None
+        interval = float(np.median(intervals))
+
+        period = min(PERIOD_DAYS, key=lambda name: abs(PERIOD_DAYS[name] - interval))
+        if abs(PERIOD_DAYS[period] - interval) > PERIOD_TOLERANCE * PERIOD_DAYS[period]:
+            return None
+
+        regularity = np.mean(np.abs(intervals - interval) <= max(INTERVAL_SLACK_DAYS, PERIOD_TOLERANCE * interval))
+        steadiness = np.mean(np.abs(amounts - amount) <= AMOUNT_TOLERANCE * abs(amount)) if amount else 0.0
+        if regularity < MIN_REGULARITY or steadiness < MIN_REGULARITY:
+            return None
+        return self._describe(period, interval, amount, float(regularity * steadiness), "history")
+
+    def _describe(self, period, interval, amount, confidence, source):
+        last = self.days[-1]
+        interval = round(interval)
+        return {
+            "description": self.description,
+            "category": self.category,
+            "amount": round(amount, 2),
+            "period": period,
+            "interval_days": interval,
+            "occurrences": len(self.days),
+            "last_date": day_date(last).isoformat(),
+            "next_date": day_date(add_period(last, period, interval)).isoformat(),
+            "confidence": round(confidence, 2),
+            "source": source
+        }
+
+
+class RecurringDetector:
+    """Recurring series of one partition, re-analyzed lazily per changed series"""
+
+    def __init__(self):
+        self.series = {}
+        self.results = {}
+        self.dirty = set()
+
+    def add(self, expense):
+        day = day_number(expense["date"])
+        if day is None:
+            return
+        key = recurring_key(expense["description"])
+        self.series.setdefault(key, RecurringSeries()).add(expense, day)
+        self.dirty.add(key)
+
+    def remove(self, expense):
+        key = recurring_key(expense["description"])
+        series = self.series.get(key)
+        if series is None or expense["id"] not in series.ids:
+            return
+        series.remove(expense["id"])
+        if not series.days:
+            del self.series[key]
+        self.dirty.add(key)
+
+    def refresh(self):
+        """Re-analyze the series that changed since the last call"""
+        for key in self.dirty:
+            series = self.series.get(key)
+            result = series.analyze(key) if series is not None else None
+            if result is None:
+                self.results.pop(key, None)
+            else:
+                self.results[key] = (series.days[-1], result)
+        self.dirty.clear()
+
+    def detected(self):
+        """Every series that currently looks recurring, most confident first"""
+        self.refresh()
+        return sorted((result for _, result in self.results.values()), key=lambda result: -result["confidence"])
+
+    def upcoming(self, category, first, last):
+        """Projected charges of a category's active recurring series on days first..last"""
+        self.refresh()
+        charges = []
+        for day, result in self.results.values():
+            if result["category"] != category:
+                continue
+            if first - day > MAX_MISSED_PERIODS * result["interval_days"]:
+                continue
+            while True:
+                day = add_period(day, result["period"], result["interval_days"])
+                if day > last:
+                    break
+                if day >= first:
+                    charges.append((day, result["amount"]))
+        return charges
@@ -0,0 +1,91 @@
+# Reports for Smart Budget Buddy
+# Aggregations computed with NumPy over a partition's column arrays
+# (see columns.py) instead of looping over expense dicts
+
+from datetime import date
+import numpy as np
+from windows import day_number
+
+TIMESERIES_BUCKETS = ("day", "week", "month")
+
+
+def bucket_indexes(dates, bucket):
+    """Number each date by its bucket: days, weeks (starting Monday) or months since 1970"""
+    if bucket == "month":
+        return dates.astype("datetime64[M]").astype(np.int64)
+
+    days = dates.astype("datetime64[D]").astype(np.int64)
+    if bucket == "week":
+        # 1970-01-01 was a Thursday, so shift by 3 days to start weeks on Monday
+        return (days + 3) // 7
+    return days
+
+
+def bucket_labels(indexes, bucket):
+    if bucket == "month":
+        return np.datetime_as_string(indexes.astype("datetime64[M]")).tolist()
+    if bucket == "week":
+        indexes = indexes * 7 - 3
+    return np.datetime_as_string(indexes.astype("datetime64[D]")).tolist()
+
+
+def spending_timeseries(columns, mask, bucket="month"):
+    """Total spent and expense count per bucket, including empty buckets in between"""
+    selected = mask & ~np.isnat(columns.dates)
+    if not selected.any():
+        return {"labels": [], "values": [], "counts": []}
+
+    indexes = bucket_indexes(columns.dates[selected], bucket)
+    first = indexes.min()
+    offsets = indexes - first
+
+    totals = np.bincount(offsets, weights=columns.amounts[selected])
+    counts = np.bincount(offsets)
+
+    return {
+        "labels": bucket_labels(first + np.arange(len(totals)), bucket),
+        "values": np.round(totals, 2).tolist(),
+        "counts": counts.tolist()
+    }
+
+
+def budget_state(percentage):
+    """Classify budget usage the same way the dashboard does"""
+    if percentage > 100:
+        return "over"
+    if percentage > 80:
+        return "close"
+    return "good"
+
+
+def day_label(day):
+    return str(np.datetime64(day, "D"))
+
+
+def budget_entry(store, budget, today=None):
+    """Spent, remaining and status for one budget over its current period window
+
+    Also projects the recurring charges still expected before the window ends.
+    """
+    today = today or date.today()
+    spent, first, last = store.budget_spend(budget, today)
+    upcoming = sum(amount for _, amount in store.recurring.upcoming(budget["category"], day_number(today) + 1, last))
+    percentage = (spent / budget["amount"]) * 100 if budget["amount"] > 0 else 0
+    projected_percentage = ((spent + upcoming) / budget["amount"]) * 100 if budget["amount"] > 0 else 0
+    return {
+        **budget,
+        "window_start": day_label(first),
+        "window_end": day_label(last),
+        "spent": round(spent, 2),
+        "remaining": round(budget["amount"] - spent, 2),
+        "percentage": round(percentage, 1),
+        "status": budget_state(percentage),
+        "upcoming_recurring": round(upcoming, 2),
+        "projected_spent": round(spent + upcoming, 2),
+        "projected_status": budget_state(projected_percentage)
+    }
+
+
+def budget_status(store, today=None):
+    """Budget entries for every budget in the partition"""
+    return [budget_entry(store, budget, today) for budget in store.budgets]
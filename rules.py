@@ -0,0 +1,93 @@
+# Insight Rules for Smart Budget Buddy
+# This file loads the declarative insight rules from insight_rules.json and compiles
+# them once: question keywords into a single regex, and recommendation thresholds
+# into NumPy arrays that are evaluated against the category totals in one step
+
+import json
+import os
+import re
+import numpy as np
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "insight_rules.json")
+
+
+class IntentMatcher:
+    """Match a question to an intent with one compiled regex over all keywords"""
+
+    def __init__(self, intents, default_intent):
+        # Intents are listed in priority order; the first one with a keyword in the question wins
+        self.intents = [entry["intent"] for entry in intents]
+        self.default_intent = default_intent
+
+        alternatives = []
+        for index, entry in enumerate(intents):
+            if not entry["keywords"] or not all(entry["keywords"]):
+                raise ValueError(f"Intent {entry['intent']!r} needs at least one non-empty keyword")
+            keywords = "|".join(re.escape(keyword.lower()) for keyword in entry["keywords"])
+            # Zero-width lookaheads, so a keyword inside another intent's longer keyword
+            # ("cut" in "haircut") is still found at its own position
+            alternatives.append(f"(?=(?P<i{index}>{keywords}))")
+        self._pattern = re.compile("|".join(alternatives)) if alternatives else None
+
+    def match(self, question):
+        if self._pattern is None:
+            return self.default_intent
+
+        matched = {int(m.lastgroup[1:]) for m in self._pattern.finditer(question.lower())}
+        if not matched:
+            return self.default_intent
+        return self.intents[min(matched)]
+
+
+class RecommendationRules:
+    """Threshold rules compiled into arrays over a [total, category...] vector"""
+
+    def __init__(self, rules, default_recommendations, max_recommendations=3):
+        self.default_recommendations = list(default_recommendations)
+        self.max_recommendations = max_recommendations
+        self.messages = [rule["message"] for rule in rules]
+
+        # Slot 0 of the values vector is the total; every other metric is a category
+        self.categories = sorted({rule["metric"] for rule in rules} - {"total"})
+        slots = {category: index + 1 for index, category in enumerate(self.categories)}
+        slots["total"] = 0
+
+        self._metric_slots = np.array([slots[rule["metric"]] for rule in rules], dtype=np.intp)
+        self._thresholds = np.array([rule["above"] for rule in rules], dtype=np.float64)
+
+    def evaluate(self, total_spent, categories):
+        """Return the messages of the rules that fire, in rule order"""
+        values = np.empty(len(self.categories) + 1, dtype=np.float64)
+        values[0] = total_spent
+        values[1:] = [categories.get(category, 0) for category in self.categories]
+
+        fired = np.flatnonzero(values[self._metric_slots] > self._thresholds)
+        if fired.size == 0:
+            return self.default_recommendations[:self.max_recommendations]
+        return [self.messages[index] for index in fired[:self.max_recommendations]]
+
+
+class InsightRules:
+    """Compiled insight rule set"""
+
+    def __init__(self, config):
+        self.intent_matcher = IntentMatcher(config["intents"], config["default_intent"])
+        self.recommendation_rules = RecommendationRules(
+            config["recommendations"],
+            config["default_recommendations"],
+            config.get("max_recommendations", 3)
+        )
+        self.highlight_top_category_above = config.get("highlight_top_category_above", 200)
+
+    def match_intent(self, question):
+        return self.intent_matcher.match(question)
+
+    def recommend(self, total_spent, categories):
+        return self.recommendation_rules.evaluate(total_spent, categories)
+
+
+def load_insight_rules(path=None):
+    """Load and compile the insight rules from a JSON config file"""
+    path = path or os.getenv("INSIGHT_RULES_PATH") or DEFAULT_RULES_PATH
+    with open(path) as f:
+        return InsightRules(json.load(f))
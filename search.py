@@ -0,0 +1,183 @@
+# Expense Search for Smart Budget Buddy
+# An inverted index over expense descriptions, updated on every insert and
+# delete. Query words match whole terms, term prefixes ("uber" finds "ubereats")
+# and, when neither matches, similar spellings found through a trigram index.
+# Results are ranked with BM25
+
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+import numpy as np
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Expanded terms count for less than the word that was typed
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+
+# Prefix matches considered per query word (very short words match many terms)
+PREFIX_MAX_TERMS = 50
+
+# Minimum Dice similarity of trigram sets for a fuzzy match, and how many to use
+FUZZY_MIN_SIMILARITY = 0.4
+FUZZY_MAX_TERMS = 5
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Inverted index of one partition's expense descriptions"""
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.terms = []
+        self.trigram_terms = {}
+        # Per-term (ids, term frequencies, doc lengths) arrays, built on first query
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, expense_id, text):
+        tokens = tokenize(text)
+        self.doc_lengths[expense_id] = len(tokens)
+        self.total_length += len(tokens)
+        for term, count in Counter(tokens).items():
+            docs = self.postings.get(term)
+            if docs is None:
+                docs = self.postings[term] = {}
+                insort(self.terms, term)
+                for gram in trigrams(term):
+                    self.trigram_terms.setdefault(gram, set()).add(term)
+            docs[expense_id] = count
+            self._arrays.pop(term, None)
+
+    def remove(self, expense_id, text):
+        length = self.doc_lengths.pop(expense_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in set(tokenize(text)):
+            docs = self.postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(expense_id, None)
+            self._arrays.pop(term, None)
+            if not docs:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+                for gram in trigrams(term):
+                    self.trigram_terms[gram].discard(term)
+
+    def expand(self, word):
+        """Index terms a query word matches, with a weight for each"""
+        matches = {}
+        start = bisect_left(self.terms, word)
+        for term in self.terms[start:start + PREFIX_MAX_TERMS]:
+            if not term.startswith(word):
+                break
+            matches[term] = 1.0 if term == word else PREFIX_WEIGHT
+        if matches or len(word) < 3:
+            return matches
+
+        # No exact or prefix match: fall back to similar spellings
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigram_terms.get(gram, ()))
+        scored = []
+        for term, count in shared.items():
+            similarity = 2 * count / (len(grams) + len(trigrams(term)))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((similarity, term))
+        for similarity, term in sorted(scored, reverse=True)[:FUZZY_MAX_TERMS]:
+            matches[term] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            docs = self.postings[term]
+            ids = np.fromiter(docs.keys(), dtype=np.int64, count=len(docs))
+            frequencies = np.fromiter(docs.values(), dtype=np.float64, count=len(docs))
+            lengths = np.fromiter((self.doc_lengths[i] for i in docs), dtype=np.float64, count=len(docs))
+            order = np.argsort(ids)
+            arrays = self._arrays[term] = (ids[order], frequencies[order], lengths[order])
+        return arrays
+
+    def word_scores(self, word, average_length):
+        """(ids, scores) of the documents matching one query word, best expansion per document"""
+        id_parts, score_parts = [], []
+        for term, weight in self.expand(word).items():
+            ids, frequencies, lengths = self.term_arrays(term)
+            df = len(ids)
+            idf = math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+            id_parts.append(ids)
+            score_parts.append(weight * idf * frequencies * (BM25_K1 + 1) / (frequencies + norm))
+
+        if not id_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ids = np.concatenate(id_parts)
+        scores = np.concatenate(score_parts)
+        if len(id_parts) > 1:
+            order = np.lexsort((-scores, ids))
+            ids, scores = ids[order], scores[order]
+            first = np.ones(len(ids), dtype=bool)
+            first[1:] = ids[1:] != ids[:-1]
+            ids, scores = ids[first], scores[first]
+        return ids, scores
+
+    def search(self, query):
+        """(ids, scores) of the documents matching every query word, unordered"""
+        words = tokenize(query)
+        if not words or not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        average_length = max(self.total_length / len(self), 1)
+        matches = sorted(
+            (self.word_scores(word, average_length) for word in dict.fromkeys(words)),
+            key=lambda match: len(match[0])
+        )
+
+        # Both id arrays are sorted, so look the rarest word's ids up in the others
+        ids, scores = matches[0]
+        for word_ids, word_scores in matches[1:]:
+            if not len(ids):
+                break
+            positions = np.minimum(np.searchsorted(word_ids, ids), len(word_ids) - 1)
+            found = word_ids[positions] == ids
+            ids = ids[found]
+            scores = scores[found] + word_scores[positions[found]]
+        return ids, scores
+
+
+def top_results(ids, scores, limit, allowed=None):
+    """The `limit` best matches, best first, plus the number of matches
+
+    `allowed` is an array of the ids that pass the category/date filters, or None.
+    """
+    if allowed is not None:
+        keep = np.isin(ids, allowed)
+        ids, scores = ids[keep], scores[keep]
+    total = len(ids)
+
+    if len(ids) > limit:
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        ids, scores = ids[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return ids[order], scores[order], total
@@ -0,0 +1,146 @@
+# Expense Size Distributions for Smart Budget Buddy
+# Streaming quantile sketches (log-bucketed histograms, as in DDSketch) of expense
+# amounts per category and month. Each sketch is a few hundred counters at most,
+# updated on every insert and delete, and sketches of different months, categories
+# or users add up to the sketch of their combined expenses, so the median, p90 and
+# p99 of any of those groups come without reading individual expenses
+
+import math
+import numpy as np
+from forecast import bucket_index
+from reports import bucket_labels
+from windows import day_number
+
+# Every quantile is within this fraction of a true expense amount
+RELATIVE_ACCURACY = 0.01
+
+# Amounts at or below this (free items, refunds) are counted as zero
+MIN_AMOUNT = 0.01
+
+REPORTED_QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+class QuantileSketch:
+    """Counts of amounts in buckets growing by a factor of gamma; mergeable and supports removal"""
+
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    log_gamma = math.log(gamma)
+
+    def __init__(self):
+        self.counts = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, amount, count=1):
+        if amount <= MIN_AMOUNT:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(amount) / self.log_gamma)
+            remaining = self.counts.get(index, 0) + count
+            if remaining > 0:
+                self.counts[index] = remaining
+            else:
+                self.counts.pop(index, None)
+        self.count += count
+
+    def remove(self, amount):
+        self.add(amount, -1)
+
+    def merge(self, other):
+        """Add another sketch's counts to this one"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantiles(self, qs):
+        """Estimated amounts at each quantile in qs (None for an empty sketch)"""
+        if self.count <= 0:
+            return [None] * len(qs)
+        indexes = np.array(sorted(self.counts), dtype=np.int64)
+        ranks = np.cumsum([self.counts[index] for index in indexes.tolist()]) + self.zero_count
+        values = 2 * self.gamma ** indexes / (self.gamma + 1)
+        estimates = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            if rank < self.zero_count or not len(indexes):
+                estimates.append(0.0)
+            else:
+                estimates.append(float(values[min(np.searchsorted(ranks, rank, side="right"), len(values) - 1)]))
+        return estimates
+
+    def summary(self):
+        """Count plus p50, p90 and p99"""
+        estimates = self.quantiles(list(REPORTED_QUANTILES.values()))
+        return {
+            "count": self.count,
+            **{name: round(value, 2) if value is not None else None for name, value in zip(REPORTED_QUANTILES, estimates)}
+        }
+
+
+def month_index(value):
+    """Months since 1970-01 for a YYYY-MM string, or None; raises ValueError for bad months"""
+    if value is None:
+        return None
+    return int(np.datetime64(value, "M").astype(np.int64))
+
+
+def merge_sketches(sketches):
+    """One sketch of everything counted by the given sketches"""
+    merged = QuantileSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+class ExpenseSketches:
+    """Amount sketches of one partition per (category, month index)"""
+
+    def __init__(self):
+        self.sketches = {}
+
+    def add(self, expense):
+        sketch = self._sketch(expense)
+        if sketch is not None:
+            sketch.add(expense["amount"])
+
+    def remove(self, expense):
+        sketch = self._sketch(expense)
+        if sketch is not None:
+            sketch.remove(expense["amount"])
+
+    def select(self, category=None, first_month=None, last_month=None):
+        """(month index, sketch) pairs of a category (or all) between two month indexes, inclusive"""
+        return [
+            (month, sketch) for (sketch_category, month), sketch in self.sketches.items()
+            if (category is None or sketch_category == category)
+            and (first_month is None or month >= first_month)
+            and (last_month is None or month <= last_month)
+        ]
+
+    def category_summaries(self):
+        """Distribution of every category over all months"""
+        by_category = {}
+        for (category, _), sketch in self.sketches.items():
+            by_category.setdefault(category, QuantileSketch()).merge(sketch)
+        return {category: sketch.summary() for category, sketch in by_category.items() if sketch.count > 0}
+
+    def monthly_summaries(self, category=None, first_month=None, last_month=None):
+        """Distribution of each month with expenses, oldest first"""
+        by_month = {}
+        for month, sketch in self.select(category, first_month, last_month):
+            by_month.setdefault(month, QuantileSketch()).merge(sketch)
+        months = sorted(month for month, sketch in by_month.items() if sketch.count > 0)
+        labels = bucket_labels(np.array(months, dtype=np.int64), "month")
+        return [{"month": label, **by_month[month].summary()} for label, month in zip(labels, months)]
+
+    def _sketch(self, expense):
+        day = day_number(expense["date"])
+        if day is None:
+            return None
+        key = (expense["category"], bucket_index(day, "month"))
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = QuantileSketch()
+        return sketch
@@ -0,0 +1,181 @@
+# Expense Store for Smart Budget Buddy
+# In-memory storage partitioned per user (tenant). Each partition keeps its own
+# expenses, budgets, running category totals, per-category daily spending rings
+# (see windows.py), a description search index (see search.py), recurring
+# charge detection (see recurring.py), spending anomaly statistics (see
+# anomalies.py), bucketed totals for forecasts (see forecast.py) and expense
+# size sketches (see sketches.py), so reports and searches for one user never
+# scan another user's data
+
+from columns import ExpenseColumns
+from windows import DailyRing, day_number, period_window
+from search import SearchIndex
+from recurring import RecurringDetector
+from duplicates import DuplicateIndex
+from anomalies import AnomalyDetector
+from forecast import ForecastModels
+from sketches import ExpenseSketches
+from test_data import get_sample_expenses, get_sample_budgets
+
+# Partition used for requests without a token; it starts with the sample data
+DEMO_TENANT = "demo"
+
+
+class TenantStore:
+    """Expenses and budgets belonging to one user"""
+
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self.version = 0
+        self.load([], [])
+
+    def load(self, expenses, budgets):
+        """Replace the partition contents and rebuild the running totals"""
+        self.expenses = {}
+        self.budgets = []
+        self.category_totals = {}
+        self.category_counts = {}
+        self.daily_spend = {}
+        self.category_budgets = {}
+        self.budget_windows = {}
+        self.search_index = SearchIndex()
+        self.recurring = RecurringDetector()
+        self.duplicates = DuplicateIndex()
+        self.anomalies = AnomalyDetector()
+        self._columns = None
+        self.forecasts = ForecastModels()
+        self.sketches = ExpenseSketches()
+        self.next_expense_id = 1
+
+        for budget in budgets:
+            self._insert_budget(budget)
+        for expense in expenses:
+            self._insert_expense(expense)
+
+        self.version += 1
+
+    def list_expenses(self):
+        return list(self.expenses.values())
+
+    def columns(self):
+        """Column arrays of the expenses, built once and then kept up to date by every write"""
+        if self._columns is None:
+            self._columns = ExpenseColumns(self.list_expenses())
+        return self._columns
+
+    def add_expense(self, expense):
+        """Store a new expense, assigning its id; returns the spending anomalies it caused"""
+        expense["id"] = self.next_expense_id
+        anomalies = self._insert_expense(expense)
+        self.version += 1
+        return anomalies
+
+    def delete_expense(self, expense_id):
+        """Remove an expense; returns the removed expense or None"""
+        expense = self.expenses.pop(expense_id, None)
+        if expense is None:
+            return None
+
+        self.search_index.remove(expense_id, expense["description"])
+        self.recurring.remove(expense)
+        self.duplicates.remove(expense)
+        self.anomalies.remove(expense)
+        if self._columns is not None:
+            self._columns.remove(expense_id)
+        self.forecasts.remove(expense)
+        self.sketches.remove(expense)
+
+        category = expense["category"]
+        self.category_counts[category] -= 1
+        if self.category_counts[category] == 0:
+            del self.category_counts[category]
+            del self.category_totals[category]
+        else:
+            self.category_totals[category] -= expense["amount"]
+
+        day = day_number(expense["date"])
+        if day is not None and category in self.daily_spend:
+            self.daily_spend[category].remove(day, expense["amount"])
+            self._adjust_budget_windows(category, day, -expense["amount"])
+
+        self.version += 1
+        return expense
+
+    def add_budget(self, budget):
+        """Store a new budget, assigning its id"""
+        budget["id"] = max((b["id"] for b in self.budgets), default=0) + 1
+        self._insert_budget(budget)
+        self.version += 1
+        return budget
+
+    def total_spent(self):
+        return sum(self.category_totals.values())
+
+    def budget_spend(self, budget, today=None):
+        """Spending in the budget's window containing today: (spent, first day, last day)
+
+        The sum is read from the daily ring once per window and then kept up to
+        date by every insert and delete, so repeated checks are O(1).
+        """
+        first, last = period_window(budget.get("period", "monthly"), budget.get("window", "calendar"), today)
+        entry = self.budget_windows.get(budget["id"])
+        if entry is None or entry[0] != first or entry[1] != last:
+            ring = self.daily_spend.get(budget["category"])
+            spent = ring.window_sum(first, last, today) if ring is not None else 0
+            entry = self.budget_windows[budget["id"]] = [first, last, spent]
+        return entry[2], first, last
+
+    def budgets_for(self, category):
+        return self.category_budgets.get(category, [])
+
+    def _insert_budget(self, budget):
+        self.budgets.append(budget)
+        self.category_budgets.setdefault(budget["category"], []).append(budget)
+
+    def _adjust_budget_windows(self, category, day, amount):
+        for budget in self.budgets_for(category):
+            entry = self.budget_windows.get(budget["id"])
+            if entry is not None and entry[0] <= day <= entry[1]:
+                entry[2] += amount
+
+    def _insert_expense(self, expense):
+        category = expense["category"]
+        self.expenses[expense["id"]] = expense
+        self.category_totals[category] = self.category_totals.get(category, 0) + expense["amount"]
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        self.next_expense_id = max(self.next_expense_id, expense["id"] + 1)
+        self.search_index.add(expense["id"], expense["description"])
+        self.recurring.add(expense)
+        self.duplicates.add(expense)
+        self.forecasts.add(expense)
+        self.sketches.add(expense)
+        if self._columns is not None:
+            self._columns.append(expense)
+
+        day = day_number(expense["date"])
+        if day is not None:
+            if category not in self.daily_spend:
+                self.daily_spend[category] = DailyRing()
+            self.daily_spend[category].add(day, expense["amount"])
+            self._adjust_budget_windows(category, day, expense["amount"])
+
+        return self.anomalies.add(expense)
+
+
+# All partitions, keyed by tenant
+stores = {}
+
+
+def get_store(tenant):
+    """Return the partition for a tenant, creating it on first use"""
+    store = stores.get(tenant)
+    if store is None:
+        store = stores[tenant] = TenantStore(tenant)
+        if tenant == DEMO_TENANT:
+            reset_store(store)
+    return store
+
+
+def reset_store(store):
+    """Load the sample data into a partition"""
+    store.load(get_sample_expenses(), get_sample_budgets())
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from body_limits import InsightBodyParser, MAX_VALUE_CHARS
+
+
+def parse(body, chunk_size):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    parser = InsightBodyParser()
+    for start in range(0, len(data), chunk_size):
+        parser.feed(data[start:start + chunk_size])
+    fields = parser.close()
+    return parser, fields
+
+
+def parse_split(body, at):
+    """Parse a body fed in two chunks split at byte offset `at`"""
+    parser = InsightBodyParser()
+    parser.feed(body[:at])
+    parser.feed(body[at:])
+    return parser, parser.close()
+
+
+BODY = {
+    "question": 'How do I "save" on café \\ \U0001F355?',
+    "limit": -12345.678e-2,
+    "flags": [True, False, None],
+    "expenses": [
+        {"amount": 12.5, "category": "food"},
+        {"amount": 1e2, "category": "café ☕"},
+        {"amount": 7, "category": "food", "tags": ["a", {"b": "]}"}]},
+    ],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 64, 10**6])
+def test_chunk_sizes_give_the_same_result(chunk_size):
+    parser, fields = parse(BODY, chunk_size)
+
+    assert fields == {key: value for key, value in BODY.items() if key != "expenses"}
+    assert parser.total_spent == 119.5
+    assert parser.categories == {"food": 19.5, "café ☕": 100.0}
+    assert parser.expense_count == 3
+
+
+def test_every_split_point_inside_numbers_strings_and_utf8():
+    body = json.dumps(BODY, ensure_ascii=False).encode("utf-8")
+    for at in range(1, len(body)):
+        parser, fields = parse_split(body, at)
+        assert fields["question"] == BODY["question"], at
+        assert fields["limit"] == BODY["limit"], at
+        assert parser.categories == {"food": 19.5, "café ☕": 100.0}, at
+
+
+def test_number_at_the_end_of_a_chunk_waits_for_more():
+    parser = InsightBodyParser()
+    parser.feed(b'{"expenses": [], "limit": 12')
+    parser.feed(b'34}')
+
+    assert parser.close() == {"limit": 1234}
+
+
+@pytest.mark.parametrize("body", [
+    b'{"expenses": [{"amount": 1, "category": "a"},]}',
+    b'{"expenses": [], "question": "q",}',
+    b'{"expenses": [1 2]}',
+])
+def test_trailing_commas_and_bad_separators_are_rejected(body):
+    with pytest.raises(ValueError):
+        parse(body, 4)
+
+
+def test_trailing_comma_is_rejected_without_waiting_for_the_end():
+    parser = InsightBodyParser()
+    with pytest.raises(ValueError):
+        parser.feed(b'{"expenses": [{"amount": 1, "category": "a"},]')
+
+
+def test_repeated_expenses_key_keeps_the_last_list():
+    parser, _ = parse(b'{"expenses": [{"amount": 5, "category": "a"}], '
+                      b'"expenses": [{"amount": 2, "category": "b"}]}', 7)
+
+    assert parser.total_spent == 2
+    assert parser.categories == {"b": 2}
+    assert parser.expense_count == 1
+
+
+def test_oversized_value_is_rejected_while_arriving():
+    parser = InsightBodyParser()
+    parser.feed(b'{"expenses": [], "question": "')
+    with pytest.raises(ValueError, match="at most"):
+        for _ in range(MAX_VALUE_CHARS // 1024 + 2):
+            parser.feed(b"x" * 1024)
+
+
+def test_unterminated_string_is_invalid():
+    with pytest.raises(ValueError):
+        parse(b'{"expenses": [], "question": "never closed', 5)
@@ -0,0 +1,27 @@
+import pytest
+
+from columns import ExpenseColumns
+from encoders import iter_arrow_stream
+
+pa = pytest.importorskip("pyarrow")
+
+
+def make_expense(i):
+    return {"id": i, "amount": float(i), "category": f"cat{i % 3}", "description": f"item {i}", "date": "2026-10-01"}
+
+
+def test_arrow_stream_survives_compaction_between_batches():
+    columns = ExpenseColumns([make_expense(i) for i in range(3000)])
+    stream = iter_arrow_stream(columns, columns.mask(), batch_size=1500)
+    chunks = [next(stream)]
+
+    # Enough deletes to compact the columns while the export is half sent
+    for i in range(1999):
+        columns.remove(i)
+    assert columns.size < 3000
+    chunks.extend(stream)
+
+    table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+    assert table.column("id").to_pylist() == list(range(3000))
+    assert table.column("amount").to_pylist() == [float(i) for i in range(3000)]
+    assert table.column("category").to_pylist() == [f"cat{i % 3}" for i in range(3000)]
@@ -0,0 +1,37 @@
+from lru import LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_the_ttl_or_at_their_own_time():
+    clock = Clock()
+    cache = LRUCache(10, ttl_seconds=60, clock=clock)
+    cache.set("ttl", "x")
+    cache.set("explicit", "y", expires_at=clock.now + 5)
+
+    clock.now += 5
+    assert cache.get("explicit") is None
+    assert cache.get("ttl") == "x"
+
+    clock.now += 55
+    assert cache.get("ttl") is None
+    assert len(cache) == 0
@@ -0,0 +1,45 @@
+from datetime import date
+
+from store import TenantStore
+from windows import DailyRing, RING_DAYS, day_number
+
+TODAY = date(2026, 10, 19)
+
+
+def test_far_future_day_does_not_wipe_past_spending():
+    ring = DailyRing()
+    day = day_number(TODAY)
+    ring.add(day, 50.0, TODAY)
+    ring.add(day + RING_DAYS, 20.0, TODAY)
+
+    assert ring.window_sum(day - 30, day, TODAY) == 50.0
+    assert ring.window_sum(day + RING_DAYS, day + RING_DAYS, TODAY) == 20.0
+
+
+def test_future_day_moves_into_ring_when_reached():
+    ring = DailyRing()
+    day = day_number(TODAY)
+    ring.add(day + 400, 20.0, TODAY)
+    later = date.fromordinal(TODAY.toordinal() + 300)
+
+    assert ring.window_sum(day + 400, day + 400, later) == 20.0
+    assert not ring.future
+
+    ring.remove(day + 400, 20.0)
+    assert ring.window_sum(day + 400, day + 400, later) == 0.0
+
+
+def test_budget_spend_survives_mistyped_year():
+    store = TenantStore("test")
+    store.add_budget({"category": "food", "amount": 400.0, "period": "monthly"})
+    store.add_expense({"amount": 45.67, "category": "food", "description": "Groceries", "date": "2026-10-05"})
+    store.add_expense({"amount": 12.0, "category": "food", "description": "Lunch", "date": "2026-10-10"})
+    budget = store.budgets[0]
+    assert store.budget_spend(budget, TODAY)[0] == 57.67
+
+    # A day exactly RING_DAYS after a stored one lands on the same ring slot
+    mistyped = date.fromordinal(date(2026, 10, 5).toordinal() + RING_DAYS).isoformat()
+    store.add_expense({"amount": 5.0, "category": "food", "description": "Coffee", "date": mistyped})
+    store.budget_windows.clear()
+
+    assert store.budget_spend(budget, TODAY)[0] == 57.67
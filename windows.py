@@ -0,0 +1,117 @@
+# Budget Windows for Smart Budget Buddy
+# Budget periods (weekly ... yearly) as calendar-aligned or rolling day ranges,
+# and the per-category ring buffers of daily spending that answer "how much was
+# spent in this window" without looking at individual expenses
+
+from datetime import date
+import numpy as np
+from columns import parse_date
+
+BUDGET_PERIODS = ("weekly", "biweekly", "monthly", "quarterly", "yearly")
+BUDGET_WINDOWS = ("calendar", "rolling")
+
+# Length of each period when the window is rolling (ending today)
+ROLLING_DAYS = {"weekly": 7, "biweekly": 14, "monthly": 30, "quarterly": 91, "yearly": 365}
+
+# Days kept per category: the longest window (366 days) plus room for future-dated expenses
+MAX_WINDOW_DAYS = 366
+RING_DAYS = 512
+
+# 1970-01-05 was the first Monday after the epoch; biweekly blocks start from it
+FIRST_MONDAY = 4
+
+
+def day_number(value):
+    """Days since 1970-01-01 for a date or ISO date string, or None if it can't be parsed"""
+    moment = parse_date(value)
+    if np.isnat(moment):
+        return None
+    return int(moment.astype("datetime64[D]").astype(np.int64))
+
+
+def period_window(period, window="calendar", today=None):
+    """Return the (first, last) day numbers, inclusive, of the budget window containing today"""
+    today = today or date.today()
+    day = day_number(today)
+
+    if window == "rolling":
+        return day - ROLLING_DAYS[period] + 1, day
+
+    if period == "weekly":
+        start = day - today.weekday()
+        return start, start + 6
+    if period == "biweekly":
+        start = day - (day - FIRST_MONDAY) % 14
+        return start, start + 13
+    if period == "monthly":
+        start = date(today.year, today.month, 1)
+        end = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    elif period == "quarterly":
+        first_month = (today.month - 1) // 3 * 3 + 1
+        start = date(today.year, first_month, 1)
+        end = date(today.year + (first_month + 3 > 12), (first_month + 2) % 12 + 1, 1)
+    else:
+        start = date(today.year, 1, 1)
+        end = date(today.year + 1, 1, 1)
+    return day_number(start), day_number(end) - 1
+
+
+class DailyRing:
+    """Ring buffer of daily spending sums for one category
+
+    Slot `day % RING_DAYS` holds the sum for `day`; a slot still holding an older
+    day is reset when a newer day lands on it. Summing a window reads at most
+    366 slots, no matter how long the expense history is.
+
+    Days further ahead than the ring can hold without overwriting the last 366
+    days are kept in `future` by day, and moved into the ring once today is
+    close enough, so a mistyped year can't wipe out recent spending.
+    """
+
+    def __init__(self, size=RING_DAYS):
+        self.size = size
+        self.days = np.full(size, -1, dtype=np.int64)
+        self.sums = np.zeros(size, dtype=np.float64)
+        self.future = {}
+
+    def add(self, day, amount, today=None):
+        horizon = self._fold(today)
+        if day > horizon:
+            self.future[day] = self.future.get(day, 0.0) + amount
+        else:
+            self._add_to_ring(day, amount)
+
+    def remove(self, day, amount):
+        if day in self.future:
+            self.future[day] -= amount
+            if abs(self.future[day]) < 1e-9:
+                del self.future[day]
+            return
+        slot = day % self.size
+        if self.days[slot] == day:
+            self.sums[slot] -= amount
+
+    def window_sum(self, first, last, today=None):
+        self._fold(today)
+        days = np.arange(first, last + 1)
+        slots = days % self.size
+        spent = float(self.sums[slots][self.days[slots] == days].sum())
+        return spent + sum(amount for day, amount in self.future.items() if first <= day <= last)
+
+    def _fold(self, today):
+        """Move future days the ring can now hold into it; returns the newest day it can hold"""
+        horizon = day_number(today or date.today()) + self.size - MAX_WINDOW_DAYS
+        if self.future:
+            for day in sorted(day for day in self.future if day <= horizon):
+                self._add_to_ring(day, self.future.pop(day))
+        return horizon
+
+    def _add_to_ring(self, day, amount):
+        slot = day % self.size
+        if self.days[slot] != day:
+            if self.days[slot] > day:
+                # Too old to fall inside any budget window
+                return
+            self.days[slot] = day
+            self.sums[slot] = 0.0
+        self.sums[slot] += amount